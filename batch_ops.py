@@ -0,0 +1,293 @@
+import sys
+import argparse
+from array import array
+import numpy as np
+from label_parser import parse_label_file, write_person_block
+
+# Vectorized batch operations on LabelTable columns. Every operation works on a frame window [lo, hi]
+# (inclusive) and is computed with NumPy over the start/end/label-id arrays, then expressed as a RowDiff:
+# the rows it removes and the rows it inserts, with their values. Applying or reverting a RowDiff is a
+# single vectorized splice, and a RowDiff only holds the affected rows, so batches are cheap to undo.
+
+OPERATIONS = ("replace", "relabel", "split", "clip", "shift", "delete", "merge")
+SMALL_DIFF = 64  # rows; smaller diffs are spliced in place instead of rebuilding the columns
+
+
+def _column(values, dtype):
+    return np.frombuffer(values, dtype=dtype).copy() if len(values) else np.empty(0, dtype=dtype)
+
+
+def table_columns(table):
+    """(starts, ends, label_ids) of a LabelTable as NumPy copies."""
+    return _column(table.starts, np.int32), _column(table.ends, np.int32), _column(table.label_ids, np.uint32)
+
+
+def _to_array(typecode, values):
+    out = array(typecode)
+    out.frombytes(np.ascontiguousarray(values).tobytes())
+    return out
+
+
+def _splice(table, remove_idx, insert_pos, starts, ends, label_ids):
+    """Delete rows remove_idx, then place the given rows at insert_pos of the resulting table."""
+    if len(remove_idx) + len(insert_pos) <= SMALL_DIFF:
+        columns = (table.starts, table.ends, table.label_ids)
+        for i in sorted(np.asarray(remove_idx).tolist(), reverse=True):
+            for column in columns:
+                del column[i]
+        for pos, *values in zip(np.asarray(insert_pos).tolist(), np.asarray(starts).tolist(),
+                                np.asarray(ends).tolist(), np.asarray(label_ids).tolist()):
+            for column, value in zip(columns, values):
+                column.insert(pos, value)
+        return
+    old = table_columns(table)
+    n = len(old[0])
+    m = n - len(remove_idx) + len(insert_pos)
+    keep = np.ones(n, dtype=bool)
+    keep[remove_idx] = False
+    slot = np.zeros(m, dtype=bool)
+    slot[insert_pos] = True
+    out = []
+    for column, new in zip(old, (starts, ends, label_ids)):
+        merged = np.empty(m, dtype=column.dtype)
+        merged[slot] = new
+        merged[~slot] = column[keep]
+        out.append(merged)
+    table.starts = _to_array('i', out[0])
+    table.ends = _to_array('i', out[1])
+    table.label_ids = _to_array('I', out[2])
+
+
+class RowDiff:
+    """
+    Minimal, reversible change to one person's table: rows `removed` (indexes into the table before)
+    with their old values, and rows `inserted` (indexes into the table after) with their new values.
+    """
+    __slots__ = ('person_id', 'removed', 'old', 'inserted', 'new')
+
+    def __init__(self, person_id, removed, old, inserted, new):
+        self.person_id = person_id
+        self.removed = np.asarray(removed, dtype=np.int64)
+        self.old = old  # (starts, ends, label_ids) of the removed rows
+        self.inserted = np.asarray(inserted, dtype=np.int64)
+        self.new = new  # (starts, ends, label_ids) of the inserted rows
+
+    def __len__(self):
+        return len(self.removed) + len(self.inserted)
+
+    def inverse(self):
+        return RowDiff(self.person_id, self.inserted, self.new, self.removed, self.old)
+
+    def apply(self, table):
+        _splice(table, self.removed, self.inserted, *self.new)
+
+    def revert(self, table):
+        _splice(table, self.inserted, self.removed, *self.old)
+
+    def to_record(self, table):
+        """JSON-friendly form for the edit journal (label ids are only meaningful in this process)."""
+        labels = table.vocabulary.labels
+        return {
+            "remove": self.removed.tolist(),
+            "insert": [[int(pos), labels[label_id], int(start), int(end)]
+                       for pos, start, end, label_id in zip(self.inserted, *self.new)],
+        }
+
+    @classmethod
+    def from_record(cls, table, record):
+        starts, ends, label_ids = table_columns(table)
+        removed = np.asarray(record["remove"], dtype=np.int64)
+        rows = record["insert"]
+        new = (np.array([r[2] for r in rows], dtype=np.int32), np.array([r[3] for r in rows], dtype=np.int32),
+               np.array([table.vocabulary.intern(r[1]) for r in rows], dtype=np.uint32))
+        return cls(table.person_id, removed, (starts[removed], ends[removed], label_ids[removed]),
+                   [r[0] for r in rows], new)
+
+
+def _values(starts, ends, label_ids):
+    return np.asarray(starts, dtype=np.int32), np.asarray(ends, dtype=np.int32), np.asarray(label_ids, dtype=np.uint32)
+
+
+def insert_row_diff(table, row, label, start, end):
+    """RowDiff inserting one range at row (len(table) appends)."""
+    return RowDiff(table.person_id, [], _values([], [], []), [row],
+                   _values([start], [end], [table.vocabulary.intern(label)]))
+
+
+def set_row_diff(table, row, label, start, end):
+    """RowDiff overwriting one row."""
+    old = _values([table.starts[row]], [table.ends[row]], [table.label_ids[row]])
+    return RowDiff(table.person_id, [row], old, [row], _values([start], [end], [table.vocabulary.intern(label)]))
+
+
+def delete_row_diff(table, row):
+    old = _values([table.starts[row]], [table.ends[row]], [table.label_ids[row]])
+    return RowDiff(table.person_id, [row], old, [], _values([], [], []))
+
+
+def _replace_rows(table, starts, ends, label_ids, affected, counts, new):
+    """
+    Build the RowDiff that replaces each affected row (ascending indexes) by counts[i] new rows,
+    in place, keeping the order of every other row.
+    """
+    n = len(starts)
+    emitted = np.ones(n, dtype=np.int64)
+    emitted[affected] = counts
+    first = np.cumsum(emitted) - emitted
+    group_start = np.cumsum(counts) - counts
+    inserted = np.repeat(first[affected], counts) + np.arange(counts.sum()) - np.repeat(group_start, counts)
+    old = (starts[affected], ends[affected], label_ids[affected])
+    return RowDiff(table.person_id, affected, old, inserted, new)
+
+
+def _window_pieces(starts, ends, label_ids, rows, lo, hi):
+    """For each row, its (left, inside, right) parts around [lo, hi] as (k, 3) arrays plus validity."""
+    s, e, l = starts[rows], ends[rows], label_ids[rows]
+    piece_s = np.stack([s, np.maximum(s, lo), np.full_like(s, hi + 1)], axis=1)
+    piece_e = np.stack([np.full_like(e, lo - 1), np.minimum(e, hi), e], axis=1)
+    piece_l = np.stack([l, l, l], axis=1)
+    valid = np.stack([s < lo, np.ones(len(rows), dtype=bool), e > hi], axis=1)
+    return piece_s, piece_e, piece_l, valid
+
+
+def _window_op(table, lo, hi, name, label=None, offset=0):
+    starts, ends, label_ids = table_columns(table)
+    overlap = (ends >= lo) & (starts <= hi)
+    if name == "split":
+        mask = overlap & ((starts < lo) | (ends > hi))
+    elif name == "clip":
+        mask = ~((starts >= lo) & (ends <= hi))
+    else:
+        mask = overlap
+    affected = np.flatnonzero(mask)
+    piece_s, piece_e, piece_l, valid = _window_pieces(starts, ends, label_ids, affected, lo, hi)
+    inside = np.zeros_like(valid)
+    inside[:, 1] = True
+    if name == "replace":
+        # Whole overlapping entries take the new label, their bounds are kept
+        valid &= inside
+        piece_s[:, 1] = starts[affected]
+        piece_e[:, 1] = ends[affected]
+        piece_l[:, 1] = table.vocabulary.intern(label)
+    elif name == "relabel":
+        piece_l[:, 1] = table.vocabulary.intern(label)
+    elif name == "clip":
+        valid &= inside
+        valid[:, 1] &= overlap[affected]
+    elif name == "delete":
+        valid &= ~inside
+    elif name == "shift":
+        piece_s[:, 1] += offset
+        piece_e[:, 1] += offset
+        valid[:, 1] &= piece_e[:, 1] >= 0
+        np.maximum(piece_s[:, 1], 0, out=piece_s[:, 1])
+    counts = valid.sum(axis=1)
+    new = (piece_s[valid], piece_e[valid], piece_l[valid].astype(np.uint32))
+    return _replace_rows(table, starts, ends, label_ids, affected, counts, new)
+
+
+def _merge_op(table, lo, hi, gap=1):
+    """Coalesce same-label ranges overlapping [lo, hi] that overlap or are within gap frames."""
+    starts, ends, label_ids = table_columns(table)
+    rows = np.flatnonzero((ends >= lo) & (starts <= hi))
+    if len(rows) < 2:
+        return _replace_rows(table, starts, ends, label_ids, rows[:0], rows[:0], (starts[:0], ends[:0], label_ids[:0]))
+    s, e, l = starts[rows].astype(np.int64), ends[rows].astype(np.int64), label_ids[rows].astype(np.int64)
+    order = np.lexsort((e, s, l))
+    rows, s, e, l = rows[order], s[order], e[order], l[order]
+    # Running max end within each label: offset every label by more than the frame span so one cummax works
+    big = int(e.max() - s.min()) + gap + 2
+    run = np.maximum.accumulate(e + l * big) - l * big
+    new_group = np.ones(len(rows), dtype=bool)
+    new_group[1:] = (l[1:] != l[:-1]) | (s[1:] > run[:-1] + gap)
+    group = np.cumsum(new_group) - 1
+    bounds = np.flatnonzero(new_group)
+    sizes = np.diff(np.append(bounds, len(rows)))
+    # A merged range replaces the group member that comes first in the table; the others are dropped
+    keeper = np.minimum.reduceat(rows, bounds)
+    group_end = np.maximum.reduceat(run, bounds)
+    member = sizes[group] > 1
+    affected = np.sort(rows[member])
+    is_keeper = np.isin(affected, keeper[sizes > 1])
+    counts = is_keeper.astype(np.int64)
+    kept_groups = np.flatnonzero(sizes > 1)
+    # Order the merged rows like their keepers, i.e. by table index
+    by_index = np.argsort(keeper[kept_groups])
+    kept_groups = kept_groups[by_index]
+    new = (s[bounds[kept_groups]].astype(np.int32), group_end[kept_groups].astype(np.int32),
+           l[bounds[kept_groups]].astype(np.uint32))
+    return _replace_rows(table, starts, ends, label_ids, affected, counts, new)
+
+
+def compute_diff(table, name, lo, hi, label=None, offset=0):
+    """The RowDiff operation name would make to table, without applying it."""
+    if name not in OPERATIONS:
+        raise ValueError(f"Unknown batch operation {name!r}, expected one of {', '.join(OPERATIONS)}")
+    if name in ("replace", "relabel") and not label:
+        raise ValueError(f"{name} needs a label")
+    if name == "merge":
+        return _merge_op(table, lo, hi)
+    return _window_op(table, lo, hi, name, label, offset)
+
+
+def apply_batch(labels_by_id, person_ids, name, lo, hi, label=None, offset=0):
+    """
+    Apply one operation to every listed person over frames [lo, hi]. Returns the non-empty RowDiffs,
+    which together undo the batch as one unit (revert them in reverse order).
+    """
+    diffs = []
+    for person_id in person_ids:
+        table = labels_by_id.get(person_id)
+        if table is None:
+            continue
+        diff = compute_diff(table, name, lo, hi, label, offset)
+        if len(diff):
+            diff.apply(table)
+            diffs.append(diff)
+    return diffs
+
+
+def parse_person_ids(text, all_ids):
+    """'all', or a comma-separated list of ids and id ranges like '1-5,8', resolved against all_ids."""
+    text = text.strip()
+    if not text or text.lower() == "all":
+        return list(all_ids)
+    wanted = set()
+    ranges = []
+    for part in text.split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = part.split("-", 1)
+            ranges.append((int(start), int(end)))
+        elif part:
+            wanted.add(int(part))
+    return [p for p in all_ids if int(p) in wanted or any(start <= int(p) <= end for start, end in ranges)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a batch operation to a label file.")
+    parser.add_argument("label_file")
+    parser.add_argument("operation", choices=OPERATIONS)
+    parser.add_argument("start", type=int, help="first frame of the window")
+    parser.add_argument("end", type=int, help="last frame of the window")
+    parser.add_argument("--label", help="new label for replace and relabel")
+    parser.add_argument("--offset", type=int, default=0, help="frame offset for shift")
+    parser.add_argument("--persons", default="all", help="person ids, e.g. 1-5,8 (default: all)")
+    parser.add_argument("-o", "--output", help="output file (default: overwrite the input)")
+    args = parser.parse_args(argv)
+    labels_by_id = parse_label_file(args.label_file)
+    person_ids = parse_person_ids(args.persons, labels_by_id.keys())
+    try:
+        diffs = apply_batch(labels_by_id, person_ids, args.operation, args.start, args.end, args.label, args.offset)
+    except ValueError as e:
+        parser.error(str(e))
+    with open(args.output or args.label_file, 'w') as f:
+        for person_id, entries in labels_by_id.items():
+            write_person_block(f, person_id, entries)
+    print(f"{args.operation}: changed {sum(len(d.removed) for d in diffs)} rows for {len(diffs)} persons",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
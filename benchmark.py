@@ -0,0 +1,249 @@
+import sys
+import os
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+
+# Headless benchmarks of the hot paths. Widgets run on the offscreen Qt platform with dialogs stubbed
+# out, so the suite works over SSH and in CI. Results can be saved as JSON baselines and compared
+# against later runs.
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtWidgets import QApplication, QMessageBox, QFileDialog
+from synthetic_data import generate_dataset
+from label_parser import parse_label_file
+
+PRESETS = {
+    "small": dict(persons=10, ranges=100, frames=300),
+    "medium": dict(persons=40, ranges=500, frames=2000),
+    "large": dict(persons=100, ranges=2000, frames=10000),
+}
+
+
+class Result:
+    """Latencies of one benchmark, in seconds per call, plus items processed per call."""
+
+    def __init__(self, name, latencies, items, unit, peak_bytes):
+        self.name = name
+        self.latencies = np.asarray(latencies, dtype=np.float64)
+        self.items = items
+        self.unit = unit
+        self.peak_bytes = peak_bytes
+
+    def to_dict(self):
+        p50, p99 = np.percentile(self.latencies, [50, 99])
+        return {
+            "calls": len(self.latencies),
+            "p50_ms": p50 * 1000,
+            "p99_ms": p99 * 1000,
+            "mean_ms": float(self.latencies.mean()) * 1000,
+            "throughput": self.items / p50 if p50 > 0 else float("inf"),
+            "unit": f"{self.unit}/s",
+            "peak_kb": self.peak_bytes / 1024,
+        }
+
+
+def measure(name, run, items, unit, repeat):
+    """Time repeat calls of run(), then one traced call for peak Python memory."""
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Result(name, latencies, items, unit, peak)
+
+
+def measure_calls(name, calls, unit):
+    """Time each call of an iterable of callables separately (per-call p50/p99), one item per call."""
+    calls = list(calls)
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        for call in calls[:max(1, len(calls) // 10)]:
+            call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Result(name, latencies, 1, unit, peak)
+
+
+class _QuietDialogs:
+    """Replace modal QMessageBox/QFileDialog calls with immediate answers while benchmarking widgets."""
+
+    def __init__(self, save_path):
+        self.save_path = save_path
+        self._saved = {}
+
+    def __enter__(self):
+        for cls, name, value in (
+                (QMessageBox, "information", staticmethod(lambda *a, **k: QMessageBox.Ok)),
+                (QMessageBox, "warning", staticmethod(lambda *a, **k: QMessageBox.Ok)),
+                (QFileDialog, "getSaveFileName", staticmethod(lambda *a, **k: (self.save_path, "")))):
+            self._saved[(cls, name)] = cls.__dict__[name]
+            setattr(cls, name, value)
+        return self
+
+    def __exit__(self, *exc):
+        for (cls, name), value in self._saved.items():
+            setattr(cls, name, value)
+
+
+def bench_parse(dataset, repeat):
+    path = dataset["labels"][0]
+    entries = sum(len(t) for t in parse_label_file(path).values())
+    return measure("parse_label_file", lambda: parse_label_file(path), entries, "ranges", repeat)
+
+
+def bench_merger(dataset, repeat, workdir):
+    from label_merger import LabelMerger
+    merger = LabelMerger()
+    persons = dataset["persons"]
+    for i, path in enumerate(dataset["labels"]):
+        merger.label_files.append(path)
+        merger.labels_by_file.append(parse_label_file(path))
+        merger.id_ranges.append((1 + i * persons, (i + 1) * persons))
+    entries = sum(len(t) for labels in merger.labels_by_file for t in labels.values())
+    results = []
+    with _QuietDialogs(os.path.join(workdir, "merged.txt")):
+        results.append(measure("merge_files", merger.merge_files, entries, "ranges", repeat))
+        merger.normalize_check.setChecked(True)
+        results.append(measure("merge_files_normalized", merger.merge_files, entries, "ranges", repeat))
+        results.append(measure("save_merged_labels", merger.save_merged_labels, entries, "ranges", repeat))
+    merger.close()
+    return results
+
+
+def _labeler(dataset, workdir):
+    from video_labeling_tool import VideoLabeler
+    label_file = os.path.join(workdir, "labels.txt")
+    shutil.copy(dataset["labels"][0], label_file)
+    labeler = VideoLabeler()
+    labeler.frame_folder = dataset["frames"]
+    labeler.label_file = label_file
+    labeler.load_frames(wait=True)
+    labeler.load_labels()
+    return labeler
+
+
+def bench_labeler(dataset, repeat, workdir):
+    labeler = _labeler(dataset, workdir)
+    frames = len(labeler.frame_index)
+    entries = sum(len(t) for t in labeler.labels_by_id.values())
+    rng = np.random.default_rng(0)
+    results = []
+    with _QuietDialogs(labeler.label_file):
+        def save():
+            labeler.dirty_person_ids = set(labeler.labels_by_id)
+            labeler.save_labels()
+            labeler.compaction.result()
+        results.append(measure("save_labels", save, entries, "ranges", repeat))
+
+        def lookup(idx):
+            def call():
+                labeler.current_frame_idx = idx
+                labeler.update_label_list()
+            return call
+        results.append(measure_calls("update_label_list", (lookup(int(i)) for i in rng.integers(0, frames, 500)),
+                                     "lookups"))
+
+        def show(idx):
+            return lambda: labeler.show_frame_index(idx)
+        labeler.frame_cache.reset(labeler.frame_cache.load_image, frames)
+        results.append(measure_calls("load_frame", (show(i) for i in range(frames)), "frames"))
+        labeler.frame_cache.reset(labeler.frame_cache.load_image, frames)
+        results.append(measure_calls("load_frame_random", (show(int(i)) for i in rng.integers(0, frames, 200)),
+                                     "frames"))
+    labeler.close()
+    return results
+
+
+def run_suite(preset="small", repeat=5, seed=0, data_dir=None):
+    """Generate (or reuse) a dataset for preset and run every benchmark. Returns the report dict."""
+    params = PRESETS[preset]
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    workdir = tempfile.mkdtemp(prefix="labeling-bench-")
+    try:
+        root = data_dir or os.path.join(workdir, "data")
+        if not os.path.isdir(os.path.join(root, "frames")):
+            generate_dataset(root, seed=seed, **params)
+        dataset = {"frames": os.path.join(root, "frames"), "persons": params["persons"],
+                   "labels": sorted(os.path.join(root, n) for n in os.listdir(root) if n.startswith("labels_"))}
+        results = [bench_parse(dataset, repeat)]
+        results += bench_merger(dataset, repeat, workdir)
+        results += bench_labeler(dataset, repeat, workdir)
+        app.processEvents()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {"preset": preset, "params": params, "repeat": repeat, "seed": seed,
+                 "python": platform.python_version(), "machine": platform.machine(), "system": platform.system(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": {r.name: r.to_dict() for r in results},
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Lines comparing p50 against a baseline report, and whether any benchmark regressed."""
+    lines = []
+    regressed = False
+    for name, result in report["results"].items():
+        old = baseline["results"].get(name)
+        if old is None or not old["p50_ms"]:
+            lines.append(f"{name:24s} (no baseline)")
+            continue
+        ratio = result["p50_ms"] / old["p50_ms"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressed = True
+        lines.append(f"{name:24s} p50 {old['p50_ms']:9.3f} -> {result['p50_ms']:9.3f} ms  x{ratio:5.2f}{flag}")
+    return lines, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the headless performance benchmarks.")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--repeat", type=int, default=5, help="timed calls per whole-file benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data", help="reuse or create a synthetic dataset in this directory")
+    parser.add_argument("--save", metavar="JSON", help="write the report, e.g. as a baseline")
+    parser.add_argument("--compare", metavar="JSON", help="baseline report to compare p50 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed p50 slowdown against the baseline before failing (default: 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.preset, args.repeat, args.seed, args.data)
+    print(f"{'benchmark':24s} {'p50 ms':>9s} {'p99 ms':>9s} {'throughput':>16s} {'peak KiB':>9s}")
+    for name, r in report["results"].items():
+        print(f"{name:24s} {r['p50_ms']:9.3f} {r['p99_ms']:9.3f} {r['throughput']:10.0f} {r['unit']:<5s} "
+              f"{r['peak_kb']:9.0f}")
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        lines, regressed = compare(report, baseline, args.tolerance)
+        print("\n".join(lines))
+        if regressed:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
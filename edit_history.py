@@ -0,0 +1,71 @@
+from collections import deque
+
+# Undo/redo for label edits. A command holds the RowDiffs one user action made (only the affected rows
+# with their old and new values), so history memory grows with the number of edits, never with the size
+# of the label file.
+
+
+class EditCommand:
+    """One undoable action: its description and the RowDiffs it applied, in order."""
+    __slots__ = ('text', 'diffs')
+
+    def __init__(self, text, diffs):
+        self.text = text
+        self.diffs = list(diffs)
+
+    def undo(self, labels_by_id):
+        for diff in reversed(self.diffs):
+            diff.revert(labels_by_id[diff.person_id])
+
+    def redo(self, labels_by_id):
+        for diff in self.diffs:
+            diff.apply(labels_by_id[diff.person_id])
+
+
+class UndoStack:
+    def __init__(self, limit=None):
+        self._undo = deque(maxlen=limit)  # unlimited by default
+        self._redo = []
+
+    def push(self, text, diffs):
+        """Record an action that has already been applied. A new action drops the redo history."""
+        diffs = [diff for diff in diffs if len(diff)]
+        if not diffs:
+            return None
+        command = EditCommand(text, diffs)
+        self._undo.append(command)
+        self._redo.clear()
+        return command
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo_text(self):
+        return self._undo[-1].text if self._undo else ""
+
+    def redo_text(self):
+        return self._redo[-1].text if self._redo else ""
+
+    def undo(self, labels_by_id):
+        """Revert the last action. Returns its command, or None if there is nothing to undo."""
+        if not self._undo:
+            return None
+        command = self._undo.pop()
+        command.undo(labels_by_id)
+        self._redo.append(command)
+        return command
+
+    def redo(self, labels_by_id):
+        if not self._redo:
+            return None
+        command = self._redo.pop()
+        command.redo(labels_by_id)
+        self._undo.append(command)
+        return command
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtCore import Qt
+from perf_trace import TRACER
+
+
+class FrameCache:
+    """
+    Decodes and scales frames on a worker thread pool and keeps the results as QImages in an
+    LRU cache bounded by memory in bytes. QPixmaps are only created on the GUI thread, in get_pixmap.
+    load_image(idx) must return a QImage and be safe to call from worker threads.
+    """
+
+    def __init__(self, load_image=None, max_bytes=256 * 1024 * 1024, ahead=30, behind=10,
+                 size=(640, 480), workers=4):
+        self.load_image = load_image
+        self.max_bytes = max_bytes
+        self.ahead = ahead
+        self.behind = behind
+        self.size = size
+        self.frame_count = 0
+        self.hits = 0
+        self.misses = 0
+        self._images = OrderedDict()  # {idx: QImage}, least recently used first
+        self._bytes = 0
+        self._pending = {}  # {idx: Future}
+        self._generation = 0
+        self._lock = threading.RLock()  # cancel() runs done callbacks re-entrantly
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-decode")
+
+    def reset(self, load_image, frame_count):
+        """Point the cache at a new frame source, dropping everything decoded for the old one."""
+        with self._lock:
+            self._generation += 1
+            for future in list(self._pending.values()):
+                future.cancel()
+            self._pending.clear()
+            self._images.clear()
+            self._bytes = 0
+            self.load_image = load_image
+            self.frame_count = frame_count
+
+    def shutdown(self):
+        self.reset(None, 0)
+        self._executor.shutdown(wait=False)
+
+    def _decode(self, idx, generation):
+        if generation != self._generation:
+            return None
+        with TRACER.span("decode"):
+            image = self.load_image(idx)
+            if image is None or image.isNull():
+                return None
+            width, height = self.size
+            return image.scaled(width, height, Qt.KeepAspectRatio)
+
+    def _store(self, idx, generation, image):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._pending.pop(idx, None)
+            if image is None or idx in self._images:
+                return
+            self._images[idx] = image
+            self._bytes += image.sizeInBytes()
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                _, old = self._images.popitem(last=False)
+                self._bytes -= old.sizeInBytes()
+
+    def _submit(self, idx, generation):
+        future = self._executor.submit(self._decode, idx, generation)
+        self._pending[idx] = future
+        future.add_done_callback(
+            lambda f: self._store(idx, generation, None if f.cancelled() or f.exception() else f.result()))
+        return future
+
+    def get_image(self, idx):
+        """Return the scaled QImage for idx, decoding synchronously on a miss."""
+        with self._lock:
+            generation = self._generation
+            image = self._images.get(idx)
+            if image is not None:
+                self._images.move_to_end(idx)
+                self.hits += 1
+                return image
+            self.misses += 1
+            future = self._pending.get(idx)
+        if future is not None and future.cancel():
+            future = None
+        if future is not None:
+            # Already being decoded by a worker: waiting is cheaper than decoding twice
+            image = future.result()
+        else:
+            image = self._decode(idx, generation)
+        self._store(idx, generation, image)
+        return image
+
+    def get_pixmap(self, idx):
+        image = self.get_image(idx)
+        if image is None:
+            return QPixmap()
+        return QPixmap.fromImage(image)
+
+    def prefetch(self, center, stride=1):
+        """
+        Queue decodes around center, nearest frames first, alternating forward and backward.
+        Forward frames are taken every stride frames, matching what fast playback will show.
+        """
+        if self.load_image is None:
+            return
+        lo = max(0, center - self.behind)
+        hi = min(self.frame_count - 1, center + self.ahead * stride)
+        order = []
+        for step in range(1, max(self.ahead, self.behind) + 1):
+            if center + step * stride <= hi:
+                order.append(center + step * stride)
+            if center - step >= lo:
+                order.append(center - step)
+        wanted = set(order)
+        with self._lock:
+            generation = self._generation
+            for idx, future in list(self._pending.items()):
+                if idx not in wanted and future.cancel():
+                    self._pending.pop(idx, None)
+            for idx in order:
+                if idx not in self._images and idx not in self._pending:
+                    self._submit(idx, generation)
@@ -0,0 +1,74 @@
+import os
+from array import array
+from bisect import bisect_left
+
+FRAME_PREFIX = "frame_"
+FRAME_SUFFIX = ".jpg"
+FRAME_NAME_LEN = len(FRAME_PREFIX) + 6 + len(FRAME_SUFFIX)
+
+
+def frame_name(number):
+    return f"{FRAME_PREFIX}{number:06d}{FRAME_SUFFIX}"
+
+
+def parse_frame_name(name):
+    """Return the frame number of a frame_XXXXXX.jpg name, or None. Plain string checks, no regex."""
+    if len(name) != FRAME_NAME_LEN or not name.startswith(FRAME_PREFIX) or not name.endswith(FRAME_SUFFIX):
+        return None
+    digits = name[len(FRAME_PREFIX):len(FRAME_PREFIX) + 6]
+    if not digits.isdigit():
+        return None
+    return int(digits)
+
+
+def scan_frame_numbers(folder, on_first=None):
+    """
+    Stream the folder with os.scandir and return the frame numbers found as an array('I').
+    on_first(number) is called as soon as the first matching frame is seen, before the scan finishes.
+    """
+    numbers = array("I")
+    with os.scandir(folder) as it:
+        for entry in it:
+            number = parse_frame_name(entry.name)
+            if number is None:
+                continue
+            if not numbers and on_first is not None:
+                on_first(number)
+            numbers.append(number)
+    return numbers
+
+
+class FrameIndex:
+    """
+    Sorted frame numbers with O(1) index -> frame number and frame number -> index lookups.
+    Numbering may have gaps; index_of returns -1 for a frame number that is not present.
+    """
+
+    def __init__(self, numbers=()):
+        self.numbers = array("I", sorted(numbers))
+        last = self.numbers[-1] if self.numbers else -1
+        self._positions = array("i", [-1]) * (last + 1)
+        for idx, number in enumerate(self.numbers):
+            self._positions[number] = idx
+
+    def __len__(self):
+        return len(self.numbers)
+
+    def number(self, idx):
+        return self.numbers[idx]
+
+    def name(self, idx):
+        return frame_name(self.numbers[idx])
+
+    def index_of(self, number):
+        if 0 <= number < len(self._positions):
+            return self._positions[number]
+        return -1
+
+    def nearest_index(self, number):
+        """Index of the first frame whose number is >= number, clamped to the last frame."""
+        return min(bisect_left(self.numbers, number), len(self.numbers) - 1)
+
+    @classmethod
+    def from_folder(cls, folder, on_first=None):
+        return cls(scan_frame_numbers(folder, on_first))
@@ -0,0 +1,108 @@
+import sys
+import os
+import mmap
+import struct
+import argparse
+from array import array
+from frame_index import scan_frame_numbers, frame_name
+
+# Layout: header | frame numbers (u32 * n) | offsets (u64 * n) | lengths (u32 * n) | JPEG bytes
+# All integers little-endian; offsets are absolute file positions.
+MAGIC = b"FPAK"
+VERSION = 1
+HEADER = struct.Struct("<4sII")  # magic, version, frame count
+PACK_EXTENSION = ".fpack"
+
+
+def _le(arr):
+    if sys.byteorder != "little":
+        arr.byteswap()
+    return arr
+
+
+def _read_array(typecode, view):
+    arr = array(typecode)
+    arr.frombytes(view)
+    return _le(arr)
+
+
+def pack_frame_folder(folder, out_path):
+    """Concatenate every frame_XXXXXX.jpg in folder into a single pack file. Returns the frame count."""
+    numbers = sorted(scan_frame_numbers(folder))
+    count = len(numbers)
+    frame_numbers = array("I", numbers)
+    offsets = array("Q", bytes(8 * count))
+    lengths = array("I", bytes(4 * count))
+    data_start = HEADER.size + count * (4 + 8 + 4)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION, count))
+        out.seek(data_start)
+        pos = data_start
+        for i, num in enumerate(numbers):
+            with open(os.path.join(folder, frame_name(num)), "rb") as f:
+                data = f.read()
+            out.write(data)
+            offsets[i] = pos
+            lengths[i] = len(data)
+            pos += len(data)
+        out.seek(HEADER.size)
+        for arr in (frame_numbers, offsets, lengths):
+            out.write(_le(arr).tobytes())
+    os.replace(tmp_path, out_path)
+    return count
+
+
+class FramePack:
+    """Read-only, memory-mapped view of a pack file. Frame bytes are zero-copy slices of the mapping."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a frame pack (version {VERSION})")
+        view = memoryview(self._mmap)
+        pos = HEADER.size
+        self.frame_numbers = _read_array("I", view[pos:pos + 4 * count])
+        pos += 4 * count
+        self.offsets = _read_array("Q", view[pos:pos + 8 * count])
+        pos += 8 * count
+        self.lengths = _read_array("I", view[pos:pos + 4 * count])
+        view.release()
+
+    def __len__(self):
+        return len(self.frame_numbers)
+
+    def frame_bytes(self, idx):
+        start = self.offsets[idx]
+        return memoryview(self._mmap)[start:start + self.lengths[idx]]
+
+    def load_image(self, idx):
+        from PyQt5.QtGui import QImage
+        return QImage.fromData(self.frame_bytes(idx), "JPG")
+
+    def close(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A worker still holds a frame slice; the mapping is released with it
+                pass
+            self._mmap = None
+
+
+def is_frame_pack(path):
+    return bool(path) and os.path.isfile(path) and path.endswith(PACK_EXTENSION)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack a folder of frame_XXXXXX.jpg files into a single frame pack.")
+    parser.add_argument("folder")
+    parser.add_argument("output", nargs="?", help=f"defaults to <folder>{PACK_EXTENSION}")
+    args = parser.parse_args()
+    output = args.output or args.folder.rstrip(os.sep) + PACK_EXTENSION
+    count = pack_frame_folder(args.folder, output)
+    print(f"Packed {count} frames into {output}")
@@ -0,0 +1,155 @@
+import random
+
+
+class _Node:
+    __slots__ = ('start', 'end', 'seq', 'item', 'prio', 'max_end', 'left', 'right')
+
+    def __init__(self, start, end, seq, item):
+        self.start = start
+        self.end = end
+        self.seq = seq
+        self.item = item
+        self.prio = random.random()
+        self.max_end = end
+        self.left = None
+        self.right = None
+
+    def key(self):
+        return (self.start, self.end, self.seq)
+
+
+def _update(node):
+    m = node.end
+    if node.left is not None and node.left.max_end > m:
+        m = node.left.max_end
+    if node.right is not None and node.right.max_end > m:
+        m = node.right.max_end
+    node.max_end = m
+
+
+def _split(node, key):
+    """Split a treap into (nodes with key < key, nodes with key >= key)."""
+    if node is None:
+        return None, None
+    if node.key() < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        _update(node)
+        return node, right
+    left, right = _split(node.left, key)
+    node.left = right
+    _update(node)
+    return left, node
+
+
+def _merge(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if a.prio > b.prio:
+        a.right = _merge(a.right, b)
+        _update(a)
+        return a
+    b.left = _merge(a, b.left)
+    _update(b)
+    return b
+
+
+class IntervalIndex:
+    """
+    Interval tree (a treap ordered by start, augmented with the max end of each subtree) over
+    inclusive [start, end] ranges. Stabbing and overlap queries cost O(log n + k) and
+    add/remove cost O(log n), so the index can be kept in sync with edits instead of rebuilt.
+    """
+
+    def __init__(self, intervals=()):
+        self._root = None
+        self._size = 0
+        self._seq = 0
+        nodes = []
+        for start, end, item in intervals:
+            nodes.append(_Node(int(start), int(end), self._seq, item))
+            self._seq += 1
+        if nodes:
+            nodes.sort(key=_Node.key)
+            self._root = self._build(nodes)
+            self._size = len(nodes)
+
+    def _build(self, nodes):
+        # Cartesian tree over the sorted nodes: O(n) instead of n separate inserts
+        stack = []
+        for node in nodes:
+            last = None
+            while stack and stack[-1].prio < node.prio:
+                last = stack.pop()
+                _update(last)
+            node.left = last
+            if stack:
+                stack[-1].right = node
+            stack.append(node)
+        while len(stack) > 1:
+            _update(stack.pop())
+        _update(stack[0])
+        return stack[0]
+
+    def __len__(self):
+        return self._size
+
+    def add(self, start, end, item):
+        node = _Node(int(start), int(end), self._seq, item)
+        self._seq += 1
+        left, right = _split(self._root, node.key())
+        self._root = _merge(_merge(left, node), right)
+        self._size += 1
+
+    def remove(self, start, end, item):
+        """Remove one interval with the given bounds whose item equals item. Returns True if found."""
+        start, end = int(start), int(end)
+        left, rest = _split(self._root, (start, end, -1))
+        middle, right = _split(rest, (start, end + 1, -1))
+        # middle holds every node with exactly these bounds; usually just one
+        found = None
+        nodes = []
+        self._collect(middle, nodes)
+        for node in nodes:
+            if node.item is item or node.item == item:
+                found = node
+                break
+        if found is not None:
+            kept_left, tail = _split(middle, found.key())
+            _, kept_right = _split(tail, (start, end, found.seq + 1))
+            middle = _merge(kept_left, kept_right)
+            self._size -= 1
+        self._root = _merge(_merge(left, middle), right)
+        return found is not None
+
+    def _collect(self, node, out):
+        while node is not None:
+            self._collect(node.left, out)
+            out.append(node)
+            node = node.right
+
+    def stab(self, point):
+        """Return the items of all intervals containing point, ordered by (start, end)."""
+        return self.overlap(point, point)
+
+    def overlap(self, lo, hi):
+        """Return the items of all intervals overlapping [lo, hi], ordered by (start, end)."""
+        out = []
+        self._overlap(self._root, lo, hi, out)
+        return out
+
+    def _overlap(self, node, lo, hi, out):
+        while node is not None and node.max_end >= lo:
+            self._overlap(node.left, lo, hi, out)
+            if node.start > hi:
+                return
+            if node.end >= lo:
+                out.append(node.item)
+            node = node.right
+
+    def items(self):
+        nodes = []
+        self._collect(self._root, nodes)
+        return [node.item for node in nodes]
@@ -0,0 +1,209 @@
+import sys
+import os
+import json
+import argparse
+import numpy as np
+from label_parser import index_person_blocks, read_block_at
+from label_raster import EMPTY, rasterize_ranges
+from frame_index import scan_frame_numbers
+from frame_pack import FramePack, is_frame_pack
+
+# Dense per-frame export for training. The output is a (persons x frames) matrix of label ids, EMPTY
+# (-1) where a person has no label, written as .npy files that np.load(..., mmap_mode='r') can map.
+# Rows are filled one person at a time straight into memory-mapped files, so only one person's row is
+# ever in RAM. A JSON manifest next to the arrays holds the label vocabulary, person order, frame
+# range and the shard layout. Where a person's ranges overlap, the later range wins, as in the timeline.
+
+MANIFEST_VERSION = 1
+
+
+class DenseExporter:
+    """
+    Writes one row per person into <base>.npy, or into <base>.<k>.npy shards of frames_per_shard
+    columns each. Columns are every frame number in [first_frame, last_frame], or exactly the
+    given frame_numbers (sorted, e.g. the frames that exist in a folder).
+    """
+
+    def __init__(self, out_base, person_ids, first_frame, last_frame, frame_numbers=None,
+                 dtype="int32", frames_per_shard=None):
+        self.out_base = out_base
+        self.person_ids = list(person_ids)
+        self.first_frame = first_frame
+        self.last_frame = last_frame
+        self.dtype = np.dtype(dtype)
+        if frame_numbers is not None:
+            numbers = np.asarray(frame_numbers, dtype=np.int64)
+            numbers = numbers[(numbers >= first_frame) & (numbers <= last_frame)]
+            self.columns = numbers - first_frame
+            width = len(self.columns)
+        else:
+            self.columns = None
+            width = max(last_frame - first_frame + 1, 0)
+        self.width = width
+        self.labels = []  # vocabulary, index = label id in the arrays
+        self._label_ids = {}
+        self._rows = {person_id: i for i, person_id in enumerate(self.person_ids)}
+        step = frames_per_shard or width or 1
+        self.shards = []  # [(column start, column stop, path, memmap)]
+        for k, start in enumerate(range(0, max(width, 1), step)):
+            stop = min(start + step, width)
+            path = f"{out_base}.npy" if frames_per_shard is None else f"{out_base}.{k:05d}.npy"
+            array = np.lib.format.open_memmap(path, mode='w+', dtype=self.dtype,
+                                              shape=(len(self.person_ids), stop - start))
+            array[:] = EMPTY
+            self.shards.append((start, stop, path, array))
+
+    def _global_ids(self, table, row):
+        """
+        Lookup array from the table's vocabulary ids to export vocabulary ids, covering only the ids
+        in row. New labels are numbered in order of first appearance, so the export vocabulary does
+        not depend on what else the process has parsed.
+        """
+        local_ids, first = np.unique(row, return_index=True)
+        remap = np.full(int(local_ids[-1]) + 1, EMPTY, dtype=np.int64)
+        for local in local_ids[np.argsort(first)]:
+            label = table.vocabulary[int(local)]
+            label_id = self._label_ids.get(label)
+            if label_id is None:
+                label_id = self._label_ids[label] = len(self.labels)
+                self.labels.append(label)
+            remap[local] = label_id
+        return remap
+
+    def write_person(self, person_id, table):
+        """Rasterize one person's LabelTable at frame resolution and store it in their row."""
+        last = self.first_frame + (int(self.columns[-1]) if self.columns is not None and len(self.columns)
+                                   else self.width - 1)
+        span = last - self.first_frame + 1
+        row = rasterize_ranges(table.starts, table.ends, table.label_ids, self.first_frame, last, span)
+        if self.columns is not None:
+            row = row[self.columns]
+        used = row != EMPTY
+        if used.any():
+            remap = self._global_ids(table, row[used])
+            if len(self.labels) - 1 > np.iinfo(self.dtype).max:
+                raise ValueError(f"{len(self.labels)} labels do not fit in {self.dtype}")
+            row = np.where(used, remap[np.where(used, row, 0)], EMPTY)
+        i = self._rows[person_id]
+        for start, stop, _, array in self.shards:
+            array[i] = row[start:stop]
+
+    def close(self):
+        """Flush the arrays and write the manifest. Returns the manifest dict."""
+        shards = []
+        for start, stop, path, array in self.shards:
+            array.flush()
+            shards.append({"path": os.path.basename(path), "column_start": start, "column_stop": stop})
+        self.shards = []
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "shape": [len(self.person_ids), self.width],
+            "dtype": self.dtype.name,
+            "empty": EMPTY,
+            "first_frame": self.first_frame,
+            "last_frame": self.last_frame,
+            "persons": self.person_ids,
+            "labels": self.labels,
+            "shards": shards,
+        }
+        if self.columns is not None:
+            frames_path = f"{self.out_base}.frames.npy"
+            np.save(frames_path, (self.columns + self.first_frame).astype(np.int64))
+            manifest["frame_numbers"] = os.path.basename(frames_path)
+        with open(f"{self.out_base}.json", 'w') as f:
+            json.dump(manifest, f, indent=2)
+        return manifest
+
+
+def _last_labeled_frame(tables):
+    return max((max(table.ends) for table in tables if len(table)), default=-1)
+
+
+def export_labels(labels_by_id, out_base, first_frame=None, last_frame=None, frame_numbers=None, **options):
+    """
+    Export {person_id: LabelTable} (a VideoLabeler's labels_by_id or merged labels). Without a
+    frame range, frames 0 .. last labeled frame are exported. Returns the manifest.
+    """
+    if frame_numbers is not None and len(frame_numbers):
+        first_frame = int(frame_numbers[0]) if first_frame is None else first_frame
+        last_frame = int(frame_numbers[-1]) if last_frame is None else last_frame
+    if first_frame is None:
+        first_frame = 0
+    if last_frame is None:
+        last_frame = _last_labeled_frame(labels_by_id.values())
+    exporter = DenseExporter(out_base, labels_by_id, first_frame, last_frame, frame_numbers, **options)
+    for person_id, table in labels_by_id.items():
+        exporter.write_person(person_id, table)
+    return exporter.close()
+
+
+def export_label_file(path, out_base, first_frame, last_frame, frame_numbers=None, **options):
+    """
+    Export a text label file without parsing it whole: person blocks are indexed in one pass and
+    read back one person at a time. Returns the manifest.
+    """
+    offsets = index_person_blocks(path)
+    exporter = DenseExporter(out_base, offsets, first_frame, last_frame, frame_numbers, **options)
+    with open(path, 'rb') as f:
+        for person_id, block_offsets in offsets.items():
+            table = read_block_at(f, block_offsets[0])
+            for offset in block_offsets[1:]:
+                table.extend(read_block_at(f, offset))
+            exporter.write_person(person_id, table)
+    return exporter.close()
+
+
+def load_dense(manifest_path, mmap_mode='r'):
+    """(manifest, [arrays]) of an export, the arrays memory-mapped in shard order."""
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    folder = os.path.dirname(manifest_path)
+    arrays = [np.load(os.path.join(folder, shard["path"]), mmap_mode=mmap_mode) for shard in manifest["shards"]]
+    return manifest, arrays
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a label file to dense per-frame label-id arrays.")
+    parser.add_argument("label_file")
+    parser.add_argument("out_base", help="output path without extension; writes <out>.npy (or shards) and <out>.json")
+    parser.add_argument("--frames", help="frame folder or frame pack; columns are its existing frames")
+    parser.add_argument("--first", type=int, help="first frame column (default: 0 or the first frame)")
+    parser.add_argument("--last", type=int, help="last frame column (default: the last frame)")
+    parser.add_argument("--dtype", default="int32", choices=("int8", "int16", "int32"))
+    parser.add_argument("--shard-frames", type=int, help="split the frame axis into shards of this many columns")
+    args = parser.parse_args(argv)
+
+    frame_numbers = None
+    if args.frames:
+        if is_frame_pack(args.frames):
+            pack = FramePack(args.frames)
+            frame_numbers = np.array(pack.frame_numbers, dtype=np.int64)
+            pack.close()
+        else:
+            frame_numbers = np.array(scan_frame_numbers(args.frames), dtype=np.int64)
+        frame_numbers.sort()
+        if args.first is not None:
+            frame_numbers = frame_numbers[frame_numbers >= args.first]
+        if args.last is not None:
+            frame_numbers = frame_numbers[frame_numbers <= args.last]
+        if not len(frame_numbers):
+            parser.error(f"No frames of {args.frames} in the requested range")
+        first = int(frame_numbers[0]) if args.first is None else args.first
+        last = int(frame_numbers[-1]) if args.last is None else args.last
+    elif args.last is None:
+        parser.error("Give --frames or --last so the frame range is known")
+    else:
+        first, last = args.first or 0, args.last
+    try:
+        manifest = export_label_file(args.label_file, args.out_base, first, last, frame_numbers,
+                                     dtype=args.dtype, frames_per_shard=args.shard_frames)
+    except ValueError as e:
+        parser.error(str(e))
+    rows, cols = manifest["shape"]
+    print(f"Exported {rows} persons x {cols} frames, {len(manifest['labels'])} labels, "
+          f"{len(manifest['shards'])} shard(s) to {args.out_base}.json", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import os
+import glob
+import json
+import time
+from label_parser import parse_label_file, write_person_block
+from label_table import LabelEntry, LabelTable
+from batch_ops import RowDiff
+
+# Crash-safe persistence for VideoLabeler.
+#
+# Every edit is appended to "<label file>.journal" (one JSON object per line, flushed and fsynced),
+# so autosave costs one small write per edit. Compaction rewrites the canonical label file through a
+# temp file and os.replace. When compaction starts, the live journal is renamed to
+# "<label file>.journal.<base>.<n>", where <base> identifies the canonical file it applies on top of
+# (inode, size, mtime). After a crash, such a journal is replayed only if the canonical file is still
+# that base, i.e. the compaction did not get as far as os.replace.
+
+JOURNAL_SUFFIX = ".journal"
+
+
+def file_base(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return "0-0-0"
+    return f"{st.st_ino}-{st.st_size}-{st.st_mtime_ns}"
+
+
+def write_labels_atomic(path, blocks):
+    """Write [(person_id, entries), ...] to path via a temp file and os.replace."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        for person_id, entries in blocks:
+            write_person_block(f, person_id, entries)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def apply_op(labels_by_id, op):
+    """Apply one journal record to {person_id: LabelTable}. Returns the person id it touched."""
+    person_id = op["person"]
+    labels = labels_by_id.get(person_id)
+    if labels is None:
+        labels = labels_by_id[person_id] = LabelTable(person_id)
+    kind = op["op"]
+    if kind == "add":
+        labels.append(LabelEntry(person_id, *op["new"]))
+    elif kind == "edit":
+        labels[labels.index(LabelEntry(person_id, *op["old"]))] = LabelEntry(person_id, *op["new"])
+    elif kind == "delete":
+        labels.remove(LabelEntry(person_id, *op["old"]))
+    elif kind == "diff":
+        RowDiff.from_record(labels, op).apply(labels)
+    else:
+        raise ValueError(f"Unknown journal op {kind!r}")
+    return person_id
+
+
+def replay_journal(labels_by_id, path):
+    """Apply every complete record of a journal file. Returns the set of person ids touched."""
+    touched = set()
+    with open(path, 'r') as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break  # torn final write from a crash
+            touched.add(apply_op(labels_by_id, json.loads(line)))
+    return touched
+
+
+def rotated_journals(label_path):
+    """[(base, path), ...] of journals waiting for compaction, oldest first."""
+    prefix = label_path + JOURNAL_SUFFIX + "."
+    found = []
+    for path in glob.glob(glob.escape(prefix) + "*"):
+        base, _, seq = path[len(prefix):].rpartition(".")
+        if base and seq.isdigit():
+            found.append((int(seq), base, path))
+    return [(base, path) for _, base, path in sorted(found)]
+
+
+def load_with_journal(label_path):
+    """
+    Parse the canonical label file and replay any journals left by a crash.
+    Returns (labels_by_id, touched person ids).
+    """
+    labels_by_id = parse_label_file(label_path) if os.path.exists(label_path) else {}
+    touched = set()
+    current = file_base(label_path)
+    for base, path in rotated_journals(label_path):
+        if base == current:
+            touched |= replay_journal(labels_by_id, path)
+        else:
+            os.remove(path)  # already folded into the canonical file
+    if os.path.exists(label_path + JOURNAL_SUFFIX):
+        touched |= replay_journal(labels_by_id, label_path + JOURNAL_SUFFIX)
+    return labels_by_id, touched
+
+
+class LabelJournal:
+    """Append-only edit log next to a label file, plus the rotation needed for compaction."""
+
+    def __init__(self, label_path):
+        self.label_path = label_path
+        self.path = label_path + JOURNAL_SUFFIX
+        self.records = 0
+        self._file = open(self.path, 'a')
+
+    def record(self, op, person_id, **fields):
+        fields["op"] = op
+        fields["person"] = person_id
+        self._file.write(json.dumps(fields) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.records += 1
+
+    def rotate(self):
+        """Start a fresh journal and return the path the previous one was moved to."""
+        self._file.close()
+        rotated = f"{self.path}.{file_base(self.label_path)}.{time.time_ns()}"
+        os.replace(self.path, rotated)
+        self._file = open(self.path, 'a')
+        self.records = 0
+        return rotated
+
+    def discard_rotated(self, base):
+        """Drop rotated journals for base once the canonical file has been replaced."""
+        for journal_base, path in rotated_journals(self.label_path):
+            if journal_base == base:
+                os.remove(path)
+
+    def close(self):
+        self._file.close()
+        if os.path.getsize(self.path) == 0:
+            os.remove(self.path)
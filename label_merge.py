@@ -0,0 +1,209 @@
+import sys
+import re
+import heapq
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from label_parser import iter_person_blocks, index_person_blocks, read_block_at, write_person_block
+from label_table import LabelTable
+
+# Headless parse / filter-by-ID-range / merge / write pipeline behind LabelMerger.
+# Nothing here imports Qt, so it can run in batch jobs on servers without a display.
+
+RANGE_RE = re.compile(r"(\d+)-(\d+)")
+
+
+def parse_id_range(text):
+    """Parse '1-16' into (1, 16). Raises ValueError for anything else."""
+    m = RANGE_RE.match(text.strip())
+    if not m:
+        raise ValueError(f"Invalid ID range {text!r}, expected something like 1-16")
+    return int(m.group(1)), int(m.group(2))
+
+
+def parse_file_spec(spec):
+    """Parse a 'file:start-end' command-line argument into (path, (start_id, end_id))."""
+    path, sep, id_range = spec.rpartition(':')
+    if not sep or not path:
+        raise ValueError(f"Invalid input {spec!r}, expected file:start-end")
+    return path, parse_id_range(id_range)
+
+
+def filter_by_id_range(labels_by_id, start_id, end_id):
+    return {person_id: entries for person_id, entries in labels_by_id.items()
+            if start_id <= int(person_id) <= end_id}
+
+
+def load_filtered(path, id_range):
+    """Parse one label file keeping only persons inside id_range. Runs in worker processes."""
+    start_id, end_id = id_range
+    labels_by_id = {}
+    for person_id, entries in iter_person_blocks(path):
+        if not start_id <= int(person_id) <= end_id:
+            continue
+        if person_id in labels_by_id:
+            labels_by_id[person_id].extend(entries)
+        else:
+            labels_by_id[person_id] = entries
+    return labels_by_id
+
+
+def merge_labels(labels_by_file, id_ranges):
+    """
+    Merge a list of {person_id: LabelTable} (one per file) into one dict, keeping for each file only
+    the persons inside its (start_id, end_id) range. Entries keep file order, files are concatenated.
+    """
+    merged = {}
+    for labels_by_id, (start_id, end_id) in zip(labels_by_file, id_ranges):
+        if start_id is None or end_id is None:
+            raise ValueError("ID range not set for every file")
+        for person_id, entries in filter_by_id_range(labels_by_id, start_id, end_id).items():
+            if person_id not in merged:
+                merged[person_id] = LabelTable(person_id)
+            merged[person_id].extend(entries)
+    return merged
+
+
+def sorted_run(table):
+    """A person's ranges from one file as (start, end, label) tuples sorted by start."""
+    labels = table.vocabulary.labels
+    return sorted(zip(table.starts, table.ends, (labels[label_id] for label_id in table.label_ids)))
+
+
+def normalize_ranges(runs, person_id=None, on_conflict=None):
+    """
+    k-way merge already sorted (start, end, label) runs with a heap and coalesce ranges of the same
+    label that overlap or touch (end + 1 == start). Overlapping ranges with different labels are kept
+    as they are and reported as on_conflict(person_id, (label, start, end), (label, start, end)).
+    Returns the normalized (start, end, label) list sorted by start.
+    """
+    out = []
+    active = {}  # {label: [start, end]} ranges that may still grow
+    for start, end, label in heapq.merge(*runs):
+        for other, (other_start, other_end) in list(active.items()):
+            if other_end + 1 < start:
+                out.append((other_start, other_end, other))
+                del active[other]
+            elif other != label and other_end >= start and on_conflict is not None:
+                on_conflict(person_id, (other, other_start, other_end), (label, start, end))
+        current = active.get(label)
+        if current is None:
+            active[label] = [start, end]
+        elif end > current[1]:
+            current[1] = end
+    out.extend((start, end, label) for label, (start, end) in active.items())
+    out.sort()
+    return out
+
+
+def merge_person_tables(person_id, tables, on_conflict=None):
+    """Merge one person's tables from several files into a single sorted, coalesced LabelTable."""
+    merged = LabelTable(person_id)
+    for start, end, label in normalize_ranges([sorted_run(t) for t in tables], person_id, on_conflict):
+        merged.append_row(label, start, end)
+    return merged
+
+
+def merge_labels_normalized(labels_by_file, id_ranges, on_conflict=None):
+    """Like merge_labels, but each person's ranges are sorted and coalesced across files."""
+    tables_by_id = {}
+    for labels_by_id, (start_id, end_id) in zip(labels_by_file, id_ranges):
+        if start_id is None or end_id is None:
+            raise ValueError("ID range not set for every file")
+        for person_id, entries in filter_by_id_range(labels_by_id, start_id, end_id).items():
+            tables_by_id.setdefault(person_id, []).append(entries)
+    return {person_id: merge_person_tables(person_id, tables, on_conflict)
+            for person_id, tables in tables_by_id.items()}
+
+
+def stream_merge_label_files(specs, f, on_conflict=None, workers=None):
+    """
+    Normalized merge that never holds more than one person in memory: each input is first indexed
+    (byte offset of every person block, in a process pool), then persons are read back from every file
+    in ascending id order, k-way merged and written to f. Returns the number of persons written.
+    """
+    paths = [path for path, _ in specs]
+    if workers == 1 or len(specs) <= 1:
+        indexes = list(map(index_person_blocks, paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            indexes = list(pool.map(index_person_blocks, paths))
+    person_ids = set()
+    for index, (_, (start_id, end_id)) in zip(indexes, specs):
+        person_ids.update(pid for pid in index if start_id <= int(pid) <= end_id)
+    handles = [open(path, 'rb') for path in paths]
+    try:
+        for person_id in sorted(person_ids, key=int):
+            tables = []
+            for handle, index, (_, (start_id, end_id)) in zip(handles, indexes, specs):
+                if person_id in index and start_id <= int(person_id) <= end_id:
+                    tables.extend(read_block_at(handle, offset) for offset in index[person_id])
+            write_person_block(f, person_id, merge_person_tables(person_id, tables, on_conflict))
+    finally:
+        for handle in handles:
+            handle.close()
+    return len(person_ids)
+
+
+def write_merged_labels(f, merged):
+    """Write merged labels person by person in ascending person id order."""
+    for person_id in sorted(merged.keys(), key=int):
+        write_person_block(f, person_id, merged[person_id])
+
+
+def merge_label_files(specs, workers=None):
+    """
+    Parse [(path, (start_id, end_id)), ...] concurrently in a process pool and merge them.
+    workers=1 parses in-process.
+    """
+    paths = [path for path, _ in specs]
+    id_ranges = [id_range for _, id_range in specs]
+    if workers == 1 or len(specs) <= 1:
+        labels_by_file = list(map(load_filtered, paths, id_ranges))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            labels_by_file = list(pool.map(load_filtered, paths, id_ranges))
+    return merge_labels(labels_by_file, id_ranges)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge label files by person ID range without the GUI.")
+    parser.add_argument("inputs", nargs="+", metavar="file:start-end",
+                        help="label file and the person ID range to take from it, e.g. cam1.txt:1-16")
+    parser.add_argument("-o", "--output", default="-", help="output label file (default: stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="parser processes (default: one per CPU, 1 disables the pool)")
+    parser.add_argument("--normalize", action="store_true",
+                        help="sort each person's ranges, coalesce overlapping/adjacent ranges with the same "
+                             "label and report conflicting overlaps; streams one person at a time")
+    args = parser.parse_args(argv)
+    try:
+        specs = [parse_file_spec(spec) for spec in args.inputs]
+    except ValueError as e:
+        parser.error(str(e))
+
+    conflicts = []
+    def report_conflict(person_id, a, b):
+        conflicts.append((person_id, a, b))
+        print(f"Conflict for person {person_id}: {a[0]}: {a[1]} - {a[2]} overlaps {b[0]}: {b[1]} - {b[2]}",
+              file=sys.stderr)
+
+    def write(f):
+        if args.normalize:
+            return stream_merge_label_files(specs, f, report_conflict, args.workers)
+        merged = merge_label_files(specs, args.workers)
+        write_merged_labels(f, merged)
+        return len(merged)
+
+    if args.output == "-":
+        write(sys.stdout)
+    else:
+        with open(args.output, 'w') as f:
+            count = write(f)
+        print(f"Merged {len(specs)} files, {count} persons into {args.output}", file=sys.stderr)
+    if conflicts:
+        print(f"{len(conflicts)} conflicting overlaps found", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,28 +1,25 @@
 import sys
 import os
-import re
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
-    QFileDialog, QListWidget, QLineEdit, QMessageBox, QComboBox
+    QFileDialog, QListWidget, QListView, QLineEdit, QMessageBox, QComboBox, QCheckBox, QInputDialog
 )
-
-class LabelEntry:
-    def __init__(self, person_id, label, start, end):
-        self.person_id = person_id
-        self.label = label
-        self.start = int(start)
-        self.end = int(end)
-    def __str__(self):
-        return f"{self.label}: {self.start} - {self.end}"
+from PyQt5.QtCore import pyqtSlot
+from label_parser import parse_label_file
+from merged_labels_model import MergedLabelsModel
+from label_store import LabelStore, is_label_store
+from label_merge import parse_id_range, merge_labels, merge_labels_normalized, write_merged_labels
+from perf_trace import traced
+from label_export import export_labels
 
 class LabelMerger(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Label File Merger Tool")
         self.label_files = []
-        self.labels_by_file = []  # List of {person_id: [LabelEntry, ...]}
+        self.labels_by_file = []  # List of {person_id: LabelTable}
         self.id_ranges = []  # List of (start_id, end_id) for each file
-        self.merged_labels = {}  # {person_id: [LabelEntry, ...]}
+        self.merged_labels = {}  # {person_id: LabelTable}
         self.init_ui()
 
     def init_ui(self):
@@ -48,13 +45,27 @@ class LabelMerger(QWidget):
         range_btn_layout.addWidget(self.set_range_btn)
         layout.addLayout(range_btn_layout)
 
+        merge_layout = QHBoxLayout()
+        self.normalize_check = QCheckBox("Sort and coalesce ranges")
         self.merge_btn = QPushButton("Merge Files")
-        layout.addWidget(self.merge_btn)
-        self.merged_list = QListWidget()
+        merge_layout.addWidget(self.normalize_check)
+        merge_layout.addWidget(self.merge_btn, 1)
+        layout.addLayout(merge_layout)
+        self.merged_model = MergedLabelsModel(self)
+        self.merged_list = QListView()
+        self.merged_list.setUniformItemSizes(True)
+        self.merged_list.setModel(self.merged_model)
+        self.merged_filter_edit = QLineEdit()
+        self.merged_filter_edit.setPlaceholderText("Filter by person ID or label")
         layout.addWidget(QLabel("Merged Labels Preview:"))
+        layout.addWidget(self.merged_filter_edit)
         layout.addWidget(self.merged_list)
+        save_layout = QHBoxLayout()
         self.save_btn = QPushButton("Save Merged Labels")
-        layout.addWidget(self.save_btn)
+        self.export_btn = QPushButton("Export Arrays")
+        save_layout.addWidget(self.save_btn, 3)
+        save_layout.addWidget(self.export_btn, 1)
+        layout.addLayout(save_layout)
         self.setLayout(layout)
 
         self.add_file_btn.clicked.connect(self.add_label_file)
@@ -62,13 +73,25 @@ class LabelMerger(QWidget):
         self.set_range_btn.clicked.connect(self.set_id_range)
         self.merge_btn.clicked.connect(self.merge_files)
         self.save_btn.clicked.connect(self.save_merged_labels)
+        self.export_btn.clicked.connect(self.export_merged_arrays)
+        self.merged_filter_edit.textChanged.connect(self.merged_model.set_filter)
 
     def add_label_file(self):
-        file, _ = QFileDialog.getOpenFileName(self, "Select Label File", filter="Text Files (*.txt)")
-        if file:
-            self.label_files.append(file)
-            self.file_list.addItem(file)
-            labels = self.parse_label_file(file)
+        file, _ = QFileDialog.getOpenFileName(self, "Select Label File", filter="Label Files (*.txt *.sqlite *.db)")
+        if not file:
+            return
+        if is_label_store(file):
+            # Every video in a store becomes its own entry with its own ID range
+            store = LabelStore(file)
+            try:
+                sources = [(f"{file}#{video}", store.load_video(video)) for video in store.videos()]
+            finally:
+                store.close()
+        else:
+            sources = [(file, parse_label_file(file))]
+        for name, labels in sources:
+            self.label_files.append(name)
+            self.file_list.addItem(name)
             self.labels_by_file.append(labels)
             self.id_ranges.append((None, None))
             self.range_list.addItem("Not set")
@@ -86,75 +109,74 @@ class LabelMerger(QWidget):
         idx = self.file_list.currentRow()
         if idx < 0:
             return
-        text = self.range_edit.text().strip()
-        m = re.match(r"(\d+)-(\d+)", text)
-        if not m:
+        try:
+            start_id, end_id = parse_id_range(self.range_edit.text())
+        except ValueError:
             QMessageBox.warning(self, "Invalid Range", "Please enter a valid range like 1-16.")
             return
-        start_id, end_id = int(m.group(1)), int(m.group(2))
         self.id_ranges[idx] = (start_id, end_id)
         self.range_list.item(idx).setText(f"{start_id}-{end_id}")
 
-    def parse_label_file(self, path):
-        labels_by_id = {}
-        current_id = None
-        with open(path, 'r') as f:
-            lines = f.readlines()
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            m = re.match(r"(\d+):", line)
-            if m:
-                current_id = m.group(1)
-                if current_id not in labels_by_id:
-                    labels_by_id[current_id] = []
-                continue
-            if current_id and ':' in line:
-                label_part, frame_part = line.rsplit(':', 1)
-                frame_match = re.match(r"\s*(\d+)\s*-\s*(\d+)", frame_part.strip())
-                if frame_match:
-                    start, end = frame_match.groups()
-                    labels_by_id[current_id].append(LabelEntry(current_id, label_part.strip(), start, end))
-        return labels_by_id
-
+    @pyqtSlot()
+    @traced("merge_files")
     def merge_files(self):
         self.merged_labels = {}
-        for file_idx, labels_by_id in enumerate(self.labels_by_file):
-            start_id, end_id = self.id_ranges[file_idx]
+        for file_idx, (start_id, end_id) in enumerate(self.id_ranges):
             if start_id is None or end_id is None:
                 QMessageBox.warning(self, "Range Not Set", f"Set ID range for file {self.label_files[file_idx]}")
                 return
-            for person_id, entries in labels_by_id.items():
-                pid_int = int(person_id)
-                if start_id <= pid_int <= end_id:
-                    if person_id not in self.merged_labels:
-                        self.merged_labels[person_id] = []
-                    self.merged_labels[person_id].extend(entries)
+        conflicts = []
+        if self.normalize_check.isChecked():
+            self.merged_labels = merge_labels_normalized(
+                self.labels_by_file, self.id_ranges, lambda *conflict: conflicts.append(conflict))
+        else:
+            self.merged_labels = merge_labels(self.labels_by_file, self.id_ranges)
         self.update_merged_list()
+        if conflicts:
+            person_id, a, b = conflicts[0]
+            QMessageBox.warning(self, "Conflicting Labels",
+                                f"{len(conflicts)} overlapping ranges carry different labels, e.g. person {person_id}: "
+                                f"{a[0]}: {a[1]} - {a[2]} overlaps {b[0]}: {b[1]} - {b[2]}")
         QMessageBox.information(self, "Merge Complete", "Files merged by ID range.")
 
     def update_merged_list(self):
-        self.merged_list.clear()
-        for person_id in sorted(self.merged_labels.keys(), key=int):
-            self.merged_list.addItem(f"{person_id}: student, appearance")
-            for l in self.merged_labels[person_id]:
-                self.merged_list.addItem(f"  {l.label}: {l.start} - {l.end}")
+        self.merged_model.set_labels(self.merged_labels)
 
+    @pyqtSlot()
+    @traced("save_merged_labels")
     def save_merged_labels(self):
         if not self.merged_labels:
             QMessageBox.warning(self, "No Data", "No merged labels to save.")
             return
-        file, _ = QFileDialog.getSaveFileName(self, "Save Merged Label File", filter="Text Files (*.txt)")
+        file, _ = QFileDialog.getSaveFileName(self, "Save Merged Label File", filter="Label Files (*.txt *.sqlite *.db)")
         if not file:
             return
-        with open(file, 'w') as f:
-            for person_id in sorted(self.merged_labels.keys(), key=int):
-                f.write(f"{person_id}: student, appearance\n")
-                for l in self.merged_labels[person_id]:
-                    f.write(f"{l.label}: {l.start} - {l.end}\n")
+        if is_label_store(file):
+            video, ok = QInputDialog.getText(self, "Video Name", "Store merged labels as video:", text="merged")
+            if not ok or not video:
+                return
+            store = LabelStore(file)
+            try:
+                store.save_video(video, {p: self.merged_labels[p] for p in sorted(self.merged_labels, key=int)})
+            finally:
+                store.close()
+        else:
+            with open(file, 'w') as f:
+                write_merged_labels(f, self.merged_labels)
         QMessageBox.information(self, "Saved", "Merged labels saved successfully.")
 
+    def export_merged_arrays(self):
+        if not self.merged_labels:
+            QMessageBox.warning(self, "No Data", "No merged labels to export.")
+            return
+        file, _ = QFileDialog.getSaveFileName(self, "Export Label Arrays", filter="Label Arrays (*.json)")
+        if not file:
+            return
+        labels = {p: self.merged_labels[p] for p in sorted(self.merged_labels, key=int)}
+        manifest = export_labels(labels, os.path.splitext(file)[0])
+        rows, cols = manifest["shape"]
+        QMessageBox.information(self, "Exported", f"Exported {rows} persons x {cols} frames.")
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = LabelMerger()
@@ -0,0 +1,109 @@
+import re
+from label_table import LabelTable
+from perf_trace import traced
+
+# A person header looks like "12: student, appearance"; an entry looks like "walking: 10 - 42".
+# ENTRY_RE splits on the last ':' (like rsplit) and ignores anything after the frame range.
+HEADER_RE = re.compile(r"(\d+):")
+HEADER_BYTES_RE = re.compile(rb"\s*(\d+):")
+PERSON_HEADER = "{}: student, appearance\n"
+ENTRY_RE = re.compile(r"(.*):\s*(\d+)\s*-\s*(\d+)[^:]*$")
+
+
+def iter_label_records(lines, on_error=None):
+    """
+    Single pass over an iterable of lines, yielding (line_no, person_id, label, start, end) for every
+    entry. Header lines are yielded too, with label/start/end set to None.
+    Lines that are neither are skipped and reported as on_error(line_no, line) when given.
+    """
+    header_match = HEADER_RE.match
+    entry_match = ENTRY_RE.match
+    current_id = None
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        m = header_match(line)
+        if m:
+            current_id = m.group(1)
+            yield line_no, current_id, None, None, None
+            continue
+        m = entry_match(line) if current_id else None
+        if m:
+            yield line_no, current_id, m.group(1).strip(), int(m.group(2)), int(m.group(3))
+        elif on_error is not None:
+            on_error(line_no, line)
+
+
+def iter_person_blocks(path, on_error=None):
+    """
+    Stream a label file and yield (person_id, LabelTable) for each person block as soon as the
+    block ends. A person id may appear in more than one block; callers merging blocks should extend.
+    """
+    current_id = None
+    entries = None
+    with open(path, 'r') as f:
+        for _, person_id, label, start, end in iter_label_records(f, on_error):
+            if label is None:
+                if current_id is not None:
+                    yield current_id, entries
+                current_id = person_id
+                entries = LabelTable(person_id)
+            else:
+                entries.append_row(label, start, end)
+    if current_id is not None:
+        yield current_id, entries
+
+
+@traced("parse_label_file")
+def parse_label_file(path, on_error=None):
+    """Parse a whole label file into {person_id: LabelTable}, in file order."""
+    labels_by_id = {}
+    for person_id, entries in iter_person_blocks(path, on_error):
+        if person_id in labels_by_id:
+            labels_by_id[person_id].extend(entries)
+        else:
+            labels_by_id[person_id] = entries
+    return labels_by_id
+
+
+def index_person_blocks(path):
+    """
+    One streaming pass over a label file recording where each person block starts:
+    {person_id: [byte offset, ...]}. Blocks can then be read one person at a time with read_block_at.
+    """
+    offsets = {}
+    header_match = HEADER_BYTES_RE.match
+    pos = 0
+    with open(path, 'rb') as f:
+        for raw in f:
+            m = header_match(raw)
+            if m:
+                offsets.setdefault(m.group(1).decode(), []).append(pos)
+            pos += len(raw)
+    return offsets
+
+
+def read_block_at(f, offset, on_error=None):
+    """Read the person block starting at offset of a file opened in binary mode, as a LabelTable."""
+    f.seek(offset)
+    table = None
+    for _, person_id, label, start, end in iter_label_records((raw.decode('utf-8') for raw in f), on_error):
+        if label is None:
+            if table is not None:
+                break
+            table = LabelTable(person_id)
+        else:
+            table.append_row(label, start, end)
+    return table
+
+
+def write_person_block(f, person_id, entries):
+    """Write one person block (header plus one line per entry) in the label file format."""
+    f.write(PERSON_HEADER.format(person_id))
+    if isinstance(entries, LabelTable):
+        labels = entries.vocabulary.labels
+        f.writelines(f"{labels[label_id]}: {start} - {end}\n"
+                     for label_id, start, end in zip(entries.label_ids, entries.starts, entries.ends))
+    else:
+        f.writelines(f"{l.label}: {l.start} - {l.end}\n" for l in entries)
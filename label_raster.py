@@ -0,0 +1,32 @@
+import numpy as np
+
+# Range-to-row rasterization shared by the timeline strip (pixels) and the dense export (frames).
+# No Qt here so headless tools can use it.
+
+EMPTY = -1
+
+
+def rasterize_ranges(starts, ends, label_ids, first_frame, last_frame, width):
+    """
+    Downsample one person's ranges to a row of width pixels holding the label id covering each pixel
+    (EMPTY where nothing does; later rows win where ranges overlap). With width = last - first + 1 every
+    pixel is exactly one frame. Fully vectorized: ranges are mapped to pixel spans and the spans are
+    expanded with repeat/cumsum instead of a Python loop.
+    """
+    row = np.full(width, EMPTY, dtype=np.int32)
+    if len(starts) == 0 or width <= 0:
+        return row
+    starts = np.frombuffer(starts, dtype=np.int32).astype(np.int64)
+    ends = np.frombuffer(ends, dtype=np.int32).astype(np.int64)
+    labels = np.frombuffer(label_ids, dtype=np.uint32).astype(np.int32)
+    span = max(last_frame - first_frame + 1, 1)
+    keep = (ends >= first_frame) & (starts <= last_frame) & (ends >= starts)
+    if not keep.any():
+        return row
+    px_start = ((np.clip(starts[keep], first_frame, last_frame) - first_frame) * width) // span
+    px_end = ((np.clip(ends[keep], first_frame, last_frame) - first_frame) * width) // span
+    lengths = px_end - px_start + 1
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    pixels = np.repeat(px_start, lengths) + np.arange(lengths.sum()) - offsets
+    row[pixels] = np.repeat(labels[keep], lengths)
+    return row
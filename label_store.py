@@ -0,0 +1,228 @@
+import sys
+import os
+import sqlite3
+import argparse
+from array import array
+from label_parser import iter_person_blocks, write_person_block
+from label_table import LabelEntry, LabelTable
+
+# Optional SQLite backend next to the text format. One store holds any number of videos; rows are
+# indexed on (video, person, start, end) for frame-window queries and on label for cross-video queries.
+
+STORE_EXTENSIONS = (".sqlite", ".db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS vocabulary (
+    id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS persons (
+    video_id INTEGER NOT NULL,
+    person_id TEXT NOT NULL,
+    ord INTEGER NOT NULL,
+    PRIMARY KEY (video_id, person_id)
+);
+CREATE TABLE IF NOT EXISTS labels (
+    video_id INTEGER NOT NULL,
+    person_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    label_id INTEGER NOT NULL,
+    start INTEGER NOT NULL,
+    "end" INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS labels_range ON labels (video_id, person_id, start, "end");
+CREATE INDEX IF NOT EXISTS labels_label ON labels (label_id);
+"""
+
+
+def is_label_store(path):
+    return bool(path) and path.lower().endswith(STORE_EXTENSIONS)
+
+
+class LabelStore:
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._labels = {}  # {vocabulary id: label}
+        self._label_ids = {}  # {label: vocabulary id}
+        for label_id, label in self.conn.execute("SELECT id, label FROM vocabulary"):
+            self._labels[label_id] = label
+            self._label_ids[label] = label_id
+
+    def close(self):
+        self.conn.close()
+
+    def _label_id(self, label):
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            label_id = self.conn.execute("INSERT INTO vocabulary (label) VALUES (?)", (label,)).lastrowid
+            self._labels[label_id] = label
+            self._label_ids[label] = label_id
+        return label_id
+
+    def _video_id(self, video, create=False):
+        row = self.conn.execute("SELECT id FROM videos WHERE name = ?", (video,)).fetchone()
+        if row:
+            return row[0]
+        if not create:
+            raise KeyError(f"No video {video!r} in {self.path}")
+        return self.conn.execute("INSERT INTO videos (name) VALUES (?)", (video,)).lastrowid
+
+    def videos(self):
+        return [name for name, in self.conn.execute("SELECT name FROM videos ORDER BY name")]
+
+    def person_ids(self, video):
+        video_id = self._video_id(video)
+        return [p for p, in self.conn.execute(
+            "SELECT person_id FROM persons WHERE video_id = ? ORDER BY ord", (video_id,))]
+
+    def _table(self, person_id, rows):
+        table = LabelTable(person_id)
+        remap = {}
+        intern = table.vocabulary.intern
+        starts, ends, label_ids = array('i'), array('i'), array('I')
+        for label_id, start, end in rows:
+            local = remap.get(label_id)
+            if local is None:
+                local = remap[label_id] = intern(self._labels[label_id])
+            label_ids.append(local)
+            starts.append(start)
+            ends.append(end)
+        table.starts, table.ends, table.label_ids = starts, ends, label_ids
+        return table
+
+    def load_person(self, video, person_id):
+        """One person's ranges in file order, as a LabelTable."""
+        rows = self.conn.execute(
+            'SELECT label_id, start, "end" FROM labels WHERE video_id = ? AND person_id = ? ORDER BY seq',
+            (self._video_id(video), person_id))
+        return self._table(person_id, rows)
+
+    def load_video(self, video):
+        """Every person of a video as {person_id: LabelTable}, in stored person order."""
+        return {person_id: self.load_person(video, person_id) for person_id in self.person_ids(video)}
+
+    def query_window(self, video, person_id, lo, hi):
+        """LabelEntry objects of one person overlapping frames [lo, hi], served from the range index."""
+        rows = self.conn.execute(
+            'SELECT label_id, start, "end" FROM labels WHERE video_id = ? AND person_id = ? '
+            'AND start <= ? AND "end" >= ? ORDER BY start, "end"',
+            (self._video_id(video), person_id, hi, lo))
+        return [LabelEntry(person_id, self._labels[label_id], start, end) for label_id, start, end in rows]
+
+    def find_label(self, label):
+        """Yield (video, person_id, start, end) for every range labeled label, across all videos."""
+        label_id = self._label_ids.get(label)
+        if label_id is None:
+            return
+        yield from self.conn.execute(
+            'SELECT v.name, l.person_id, l.start, l."end" FROM labels l JOIN videos v ON v.id = l.video_id '
+            'WHERE l.label_id = ? ORDER BY v.name, l.person_id, l.start', (label_id,))
+
+    def _insert_rows(self, video_id, person_id, entries, seq_start=0):
+        if isinstance(entries, LabelTable):
+            # Only the labels this table uses, in order of first appearance
+            ids = {label_id: self._label_id(entries.vocabulary[label_id])
+                   for label_id in dict.fromkeys(entries.label_ids)}
+            rows = ((video_id, person_id, seq, ids[label_id], start, end) for seq, (label_id, start, end)
+                    in enumerate(zip(entries.label_ids, entries.starts, entries.ends), seq_start))
+        else:
+            rows = ((video_id, person_id, seq, self._label_id(l.label), l.start, l.end)
+                    for seq, l in enumerate(entries, seq_start))
+        self.conn.executemany(
+            'INSERT INTO labels (video_id, person_id, seq, label_id, start, "end") VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def _set_person_order(self, video_id, person_ids):
+        self.conn.execute("DELETE FROM persons WHERE video_id = ?", (video_id,))
+        self.conn.executemany("INSERT INTO persons (video_id, person_id, ord) VALUES (?, ?, ?)",
+                              ((video_id, person_id, ord_) for ord_, person_id in enumerate(person_ids)))
+
+    def save_persons(self, video, labels_by_id, person_ids=None):
+        """
+        Replace the rows of the given persons in one transaction, leaving every other person untouched.
+        person_ids, when given, is the full person order to store; new persons are appended otherwise.
+        """
+        with self.conn:
+            video_id = self._video_id(video, create=True)
+            for person_id, entries in labels_by_id.items():
+                self.conn.execute("DELETE FROM labels WHERE video_id = ? AND person_id = ?", (video_id, person_id))
+                self._insert_rows(video_id, person_id, entries)
+            if person_ids is None:
+                existing = self.person_ids(video)
+                known = set(existing)
+                person_ids = existing + [p for p in labels_by_id if p not in known]
+            self._set_person_order(video_id, person_ids)
+
+    def save_video(self, video, labels_by_id):
+        """Replace a whole video with {person_id: entries}."""
+        with self.conn:
+            video_id = self._video_id(video, create=True)
+            self.conn.execute("DELETE FROM labels WHERE video_id = ?", (video_id,))
+            for person_id, entries in labels_by_id.items():
+                self._insert_rows(video_id, person_id, entries)
+            self._set_person_order(video_id, list(labels_by_id))
+
+    def import_text(self, video, path):
+        """Stream a text label file into the store as video, replacing what was there."""
+        with self.conn:
+            video_id = self._video_id(video, create=True)
+            self.conn.execute("DELETE FROM labels WHERE video_id = ?", (video_id,))
+            counts = {}  # {person_id: rows stored so far}, a repeated block continues the sequence
+            for person_id, entries in iter_person_blocks(path):
+                seq_start = counts.get(person_id, 0)
+                self._insert_rows(video_id, person_id, entries, seq_start)
+                counts[person_id] = seq_start + len(entries)
+            self._set_person_order(video_id, list(counts))
+        return len(counts)
+
+    def export_text(self, video, path):
+        with open(path, 'w') as f:
+            for person_id in self.person_ids(video):
+                write_person_block(f, person_id, self.load_person(video, person_id))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import, export and query SQLite label stores.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="import a text label file as a video")
+    p.add_argument("store")
+    p.add_argument("label_file")
+    p.add_argument("--video", help="video name (default: label file name without extension)")
+    p = sub.add_parser("export", help="export a video to a text label file")
+    p.add_argument("store")
+    p.add_argument("video")
+    p.add_argument("label_file")
+    p = sub.add_parser("videos", help="list videos in the store")
+    p.add_argument("store")
+    p = sub.add_parser("find", help="list every range with the given label across all videos")
+    p.add_argument("store")
+    p.add_argument("label")
+    args = parser.parse_args(argv)
+
+    store = LabelStore(args.store)
+    try:
+        if args.command == "import":
+            video = args.video or os.path.splitext(os.path.basename(args.label_file))[0]
+            count = store.import_text(video, args.label_file)
+            print(f"Imported {count} persons from {args.label_file} as {video}")
+        elif args.command == "export":
+            store.export_text(args.video, args.label_file)
+        elif args.command == "videos":
+            for video in store.videos():
+                print(video)
+        elif args.command == "find":
+            for video, person_id, start, end in store.find_label(args.label):
+                print(f"{video}\t{person_id}\t{start}\t{end}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import sys
+import threading
+from array import array
+from collections.abc import MutableSequence
+
+
+class LabelEntry:
+    """One label range. Tables hand these out as lightweight snapshots; equality is by value."""
+    __slots__ = ('person_id', 'label', 'start', 'end')
+
+    def __init__(self, person_id, label, start, end):
+        self.person_id = person_id
+        self.label = label
+        self.start = int(start)
+        self.end = int(end)
+    def __str__(self):
+        return f"{self.label}: {self.start} - {self.end}"
+    def __repr__(self):
+        return f"LabelEntry({self.person_id!r}, {self.label!r}, {self.start}, {self.end})"
+    def __eq__(self, other):
+        if not isinstance(other, LabelEntry):
+            return NotImplemented
+        return (self.start == other.start and self.end == other.end
+                and self.label == other.label and self.person_id == other.person_id)
+    __hash__ = None
+
+
+class LabelVocabulary:
+    """Interned label strings, each stored once and referred to by a small integer id."""
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self._ids = {}
+        self._lock = threading.Lock()  # session loaders intern on worker threads while the GUI edits
+        for label in labels:
+            self.intern(label)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getitem__(self, label_id):
+        return self.labels[label_id]
+
+    def intern(self, label):
+        label_id = self._ids.get(label)
+        if label_id is not None:
+            return label_id
+        with self._lock:
+            label_id = self._ids.get(label)
+            if label_id is None:
+                label_id = len(self.labels)
+                label = sys.intern(label)
+                self.labels.append(label)
+                self._ids[label] = label_id
+        return label_id
+
+    def get_id(self, label):
+        return self._ids.get(label)
+
+
+# Tables share one vocabulary unless told otherwise, so extending across files copies ids as-is
+DEFAULT_VOCABULARY = LabelVocabulary()
+
+
+class LabelTable(MutableSequence):
+    """
+    Columnar storage for one person's label ranges: parallel int32 start/end arrays and an array of
+    vocabulary ids. Behaves like the old list of LabelEntry objects; items are created on access.
+    """
+
+    def __init__(self, person_id, entries=(), vocabulary=None):
+        # person_id is kept as the one shared string from the file (it may have leading zeros)
+        self.person_id = sys.intern(str(person_id))
+        self.vocabulary = DEFAULT_VOCABULARY if vocabulary is None else vocabulary
+        self.starts = array('i')
+        self.ends = array('i')
+        self.label_ids = array('I')
+        self.extend(entries)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _entry(self, i):
+        return LabelEntry(self.person_id, self.vocabulary[self.label_ids[i]], self.starts[i], self.ends[i])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._entry(j) for j in range(*i.indices(len(self)))]
+        return self._entry(i)
+
+    def __iter__(self):
+        person_id = self.person_id
+        labels = self.vocabulary.labels
+        for label_id, start, end in zip(self.label_ids, self.starts, self.ends):
+            yield LabelEntry(person_id, labels[label_id], start, end)
+
+    def __setitem__(self, i, entry):
+        if isinstance(i, slice):
+            raise TypeError("LabelTable does not support slice assignment")
+        self.starts[i] = entry.start
+        self.ends[i] = entry.end
+        self.label_ids[i] = self.vocabulary.intern(entry.label)
+
+    def __delitem__(self, i):
+        del self.starts[i]
+        del self.ends[i]
+        del self.label_ids[i]
+
+    def insert(self, i, entry):
+        self.starts.insert(i, entry.start)
+        self.ends.insert(i, entry.end)
+        self.label_ids.insert(i, self.vocabulary.intern(entry.label))
+
+    def append_row(self, label, start, end):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.label_ids.append(self.vocabulary.intern(label))
+
+    def append(self, entry):
+        self.append_row(entry.label, entry.start, entry.end)
+
+    def extend(self, entries):
+        if isinstance(entries, LabelTable):
+            self.starts.extend(entries.starts)
+            self.ends.extend(entries.ends)
+            if entries.vocabulary is self.vocabulary:
+                self.label_ids.extend(entries.label_ids)
+            else:
+                remap = [self.vocabulary.intern(label) for label in entries.vocabulary.labels]
+                self.label_ids.extend(array('I', (remap[label_id] for label_id in entries.label_ids)))
+            return
+        for entry in entries:
+            self.append_row(entry.label, entry.start, entry.end)
+
+    def label(self, i):
+        return self.vocabulary[self.label_ids[i]]
+
+    def copy(self):
+        table = LabelTable(self.person_id, vocabulary=self.vocabulary)
+        table.starts = array('i', self.starts)
+        table.ends = array('i', self.ends)
+        table.label_ids = array('I', self.label_ids)
+        return table
+
+    def index(self, entry, start=0, stop=None):
+        """Row of the first entry equal to entry, scanning the start column at C speed."""
+        label_id = self.vocabulary.get_id(entry.label)
+        if label_id is None or entry.person_id != self.person_id:
+            raise ValueError(f"{entry!r} is not in table")
+        stop = len(self) if stop is None else stop
+        i = start
+        while True:
+            try:
+                i = self.starts.index(entry.start, i, stop)
+            except ValueError:
+                raise ValueError(f"{entry!r} is not in table") from None
+            if self.ends[i] == entry.end and self.label_ids[i] == label_id:
+                return i
+            i += 1
+
+    def __reduce__(self):
+        # Ship label strings rather than vocabulary ids, which only mean something in this process
+        return (_restore_table, (self.person_id, self.starts, self.ends, self.label_ids, self.vocabulary.labels))
+
+    def __repr__(self):
+        return f"LabelTable({self.person_id!r}, {len(self)} entries)"
+
+
+def _restore_table(person_id, starts, ends, label_ids, labels):
+    table = LabelTable(person_id)
+    remap = [table.vocabulary.intern(label) for label in labels]
+    table.starts = starts
+    table.ends = ends
+    table.label_ids = array('I', (remap[label_id] for label_id in label_ids))
+    return table
@@ -0,0 +1,200 @@
+import sys
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from label_parser import iter_label_records
+from label_merge import normalize_ranges
+from frame_index import scan_frame_numbers
+from frame_pack import FramePack, is_frame_pack
+from video_session import discover_videos
+
+# Dataset-wide consistency check. Every label file found next to a frame folder or frame pack (the
+# session layout, see video_session) is streamed once on a process pool and checked against the frame
+# numbers that actually exist. The result is a JSON report with one entry per video.
+
+ERROR = "error"
+WARNING = "warning"
+MAX_ISSUES = 1000  # issues listed per video; counts always cover everything
+
+
+def find_videos(root):
+    """Yield every SessionVideo with an existing label file under root, not descending into frame folders."""
+    for dirpath, dirnames, _ in os.walk(root):
+        videos = discover_videos(dirpath)
+        frame_dirs = {os.path.basename(v.frame_source) for v in videos if os.path.isdir(v.frame_source)}
+        dirnames[:] = sorted(d for d in dirnames if d not in frame_dirs)
+        for video in videos:
+            if os.path.exists(video.label_file):
+                yield video
+
+
+def frame_numbers(frame_source):
+    """Sorted frame numbers of a frame folder or pack."""
+    if is_frame_pack(frame_source):
+        pack = FramePack(frame_source)
+        try:
+            numbers = np.array(pack.frame_numbers, dtype=np.int64)
+        finally:
+            pack.close()
+    else:
+        numbers = np.array(scan_frame_numbers(frame_source), dtype=np.int64)
+    numbers.sort()
+    return numbers
+
+
+class _Issues:
+    def __init__(self, max_issues):
+        self.max_issues = max_issues
+        self.items = []
+        self.counts = {}  # {kind: count}
+        self.errors = 0
+        self.warnings = 0
+
+    def add(self, severity, kind, message, line=None, person=None):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if severity == ERROR:
+            self.errors += 1
+        else:
+            self.warnings += 1
+        if len(self.items) < self.max_issues:
+            issue = {"severity": severity, "kind": kind, "message": message}
+            if line is not None:
+                issue["line"] = line
+            if person is not None:
+                issue["person"] = person
+            self.items.append(issue)
+
+
+def validate_label_file(label_file, numbers=None, max_issues=MAX_ISSUES):
+    """
+    Stream one label file and check it, against the sorted frame numbers when given.
+    Returns the report entry for it (without video name or frame source).
+    """
+    issues = _Issues(max_issues)
+    if numbers is not None and len(numbers):
+        first, last = int(numbers[0]), int(numbers[-1])
+        present = np.zeros(last + 1, dtype=np.uint8)
+        present[numbers] = 1
+        present = present.tobytes()  # bytes indexing is the cheapest per-record lookup
+    else:
+        first = last = present = None
+        if numbers is not None:
+            issues.add(ERROR, "no_frames", "The frame source contains no frames.")
+
+    runs = {}  # {person_id: [(start, end, label), ...]} for the conflict check
+    seen_blocks = set()
+    current = None
+    rows = 0
+
+    def malformed(line_no, line):
+        issues.add(ERROR, "malformed_line", f"Unparsable line: {line[:200]!r}", line_no, current)
+
+    with open(label_file, 'r', errors='replace') as f:
+        for line_no, person_id, label, start, end in iter_label_records(f, malformed):
+            if label is None:
+                if person_id in seen_blocks:
+                    issues.add(WARNING, "repeated_person", f"Person {person_id} has more than one block.",
+                               line_no, person_id)
+                seen_blocks.add(person_id)
+                current = person_id
+                runs.setdefault(person_id, [])
+                continue
+            rows += 1
+            if start > end:
+                issues.add(ERROR, "inverted_range", f"{label}: start {start} is after end {end}.", line_no, person_id)
+                continue
+            runs[person_id].append((start, end, label))
+            if present is None:
+                continue
+            if start < first or end > last:
+                issues.add(ERROR, "out_of_range", f"{label}: {start} - {end} is outside the frames "
+                           f"{first} - {last}.", line_no, person_id)
+            else:
+                missing = [n for n in (start, end) if not present[n]]
+                if missing:
+                    issues.add(WARNING, "missing_frame", f"{label}: {start} - {end} ends on frame(s) "
+                               f"{', '.join(map(str, missing))} that do not exist.", line_no, person_id)
+
+    def conflict(person_id, a, b):
+        issues.add(WARNING, "conflict", f"{a[0]}: {a[1]} - {a[2]} overlaps {b[0]}: {b[1]} - {b[2]}.",
+                   person=person_id)
+
+    for person_id, run in runs.items():
+        run.sort()
+        normalize_ranges([run], person_id, conflict)
+
+    return {
+        "label_file": label_file,
+        "persons": len(runs),
+        "ranges": rows,
+        "errors": issues.errors,
+        "warnings": issues.warnings,
+        "counts": issues.counts,
+        "issues": issues.items,
+    }
+
+
+def validate_video(name, label_file, frame_source, max_issues=MAX_ISSUES):
+    """Report entry for one video. Runs in a worker process, so failures are reported, not raised."""
+    try:
+        numbers = frame_numbers(frame_source) if frame_source else None
+        entry = validate_label_file(label_file, numbers, max_issues)
+        if numbers is not None:
+            entry["frames"] = len(numbers)
+            if len(numbers):
+                entry["first_frame"], entry["last_frame"] = int(numbers[0]), int(numbers[-1])
+    except (OSError, ValueError, UnicodeError) as e:
+        entry = {"label_file": label_file, "errors": 1, "warnings": 0, "counts": {"unreadable": 1},
+                 "issues": [{"severity": ERROR, "kind": "unreadable", "message": str(e)}]}
+    entry["video"] = name
+    entry["frame_source"] = frame_source
+    return entry
+
+
+def validate_dataset(root, workers=None, max_issues=MAX_ISSUES):
+    """Validate every video under root on a process pool. Returns the report dict."""
+    videos = list(find_videos(root))
+    args = ([v.name for v in videos], [v.label_file for v in videos], [v.frame_source for v in videos],
+            [max_issues] * len(videos))
+    if workers == 1 or len(videos) <= 1:
+        entries = list(map(validate_video, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            entries = list(pool.map(validate_video, *args, chunksize=max(1, len(videos) // 64)))
+    counts = {}
+    for entry in entries:
+        for kind, count in entry["counts"].items():
+            counts[kind] = counts.get(kind, 0) + count
+    return {
+        "root": os.path.abspath(root),
+        "videos": len(entries),
+        "errors": sum(e["errors"] for e in entries),
+        "warnings": sum(e["warnings"] for e in entries),
+        "counts": counts,
+        "results": entries,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate every label file under a dataset root against its frames.")
+    parser.add_argument("root", help="directory tree of frame folders / frame packs and their label files")
+    parser.add_argument("-o", "--output", default="-", help="JSON report path (default: stdout)")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="validator processes (default: one per CPU, 1 disables the pool)")
+    parser.add_argument("--max-issues", type=int, default=MAX_ISSUES, help="issues listed per video")
+    args = parser.parse_args(argv)
+    report = validate_dataset(args.root, args.workers, args.max_issues)
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f"{report['videos']} videos: {report['errors']} errors, {report['warnings']} warnings", file=sys.stderr)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+from array import array
+from bisect import bisect_right
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from label_parser import PERSON_HEADER
+
+
+class MergedLabelsModel(QAbstractListModel):
+    """
+    Lazy list model over {person_id: LabelTable}: one header row per person followed by its entries.
+    Only row offsets are precomputed; the text of a row is formatted when the view asks for it, so a
+    QListView with uniform item sizes only touches the rows in its viewport.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._labels = {}
+        self._filter = ""
+        self._person_ids = []
+        self._rows = []  # per person: None for all entries, else array of matching entry indexes
+        self._offsets = array('Q', [0])  # first row of each person, plus the total row count
+
+    def set_labels(self, labels_by_id):
+        self._labels = labels_by_id
+        self._rebuild()
+
+    def set_filter(self, text):
+        """Digits filter on person id, anything else on label text (case-insensitive substring)."""
+        self._filter = text.strip()
+        self._rebuild()
+
+    def _rebuild(self):
+        self.beginResetModel()
+        text = self._filter
+        person_ids = sorted(self._labels.keys(), key=int)
+        rows = [None] * len(person_ids)
+        if text.isdigit():
+            person_ids = [person_id for person_id in person_ids if int(person_id) == int(text)]
+            rows = [None] * len(person_ids)
+        elif text:
+            needle = text.lower()
+            kept_ids, rows = [], []
+            wanted_by_vocabulary = {}
+            for person_id in person_ids:
+                table = self._labels[person_id]
+                # Match against each vocabulary once, then select rows by label id
+                wanted = wanted_by_vocabulary.get(id(table.vocabulary))
+                if wanted is None:
+                    wanted = {label_id for label_id, label in enumerate(table.vocabulary.labels) if needle in label.lower()}
+                    wanted_by_vocabulary[id(table.vocabulary)] = wanted
+                matches = array('I', (i for i, label_id in enumerate(table.label_ids) if label_id in wanted))
+                if matches:
+                    kept_ids.append(person_id)
+                    rows.append(matches)
+            person_ids = kept_ids
+        offsets = array('Q', [0])
+        total = 0
+        for person_id, matches in zip(person_ids, rows):
+            total += 1 + (len(self._labels[person_id]) if matches is None else len(matches))
+            offsets.append(total)
+        self._person_ids = person_ids
+        self._rows = rows
+        self._offsets = offsets
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self._offsets[-1]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row = index.row()
+        p = bisect_right(self._offsets, row) - 1
+        person_id = self._person_ids[p]
+        r = row - self._offsets[p]
+        if r == 0:
+            return PERSON_HEADER.format(person_id).rstrip("\n")
+        matches = self._rows[p]
+        i = r - 1 if matches is None else matches[r - 1]
+        table = self._labels[person_id]
+        return f"  {table.label(i)}: {table.starts[i]} - {table.ends[i]}"
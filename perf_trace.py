@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import nullcontext
+from collections import deque
+import numpy as np
+
+# Opt-in timing of hot paths. Off by default: a traced function then costs one attribute check.
+# Switch it on with LABELING_PROFILE=1 or at runtime with TRACER.set_enabled(True) (the View menu in
+# VideoLabeler). While on, every span feeds a rolling histogram per name and a bounded event buffer
+# that can be exported in Chrome trace format (chrome://tracing, Perfetto).
+
+ENV_VAR = "LABELING_PROFILE"
+HISTORY = 2048  # samples kept per histogram
+MAX_EVENTS = 200000  # trace events kept for export, oldest dropped first
+
+
+class RollingHistogram:
+    """Durations of the last size samples, in seconds."""
+
+    def __init__(self, size=HISTORY):
+        self._samples = np.zeros(size, dtype=np.float64)
+        self._next = 0
+        self.count = 0
+
+    def add(self, seconds):
+        self._samples[self._next] = seconds
+        self._next = (self._next + 1) % len(self._samples)
+        self.count += 1
+
+    def samples(self):
+        return self._samples[:min(self.count, len(self._samples))].copy()
+
+    def summary(self):
+        samples = self.samples()
+        if not len(samples):
+            return {"count": 0}
+        p50, p99 = np.percentile(samples, [50, 99])
+        return {"count": self.count, "p50_ms": float(p50) * 1000, "p99_ms": float(p99) * 1000,
+                "mean_ms": float(samples.mean()) * 1000, "max_ms": float(samples.max()) * 1000}
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'start')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, self.start, time.perf_counter())
+
+
+class Tracer:
+    def __init__(self, enabled=None):
+        self.enabled = bool(os.environ.get(ENV_VAR)) if enabled is None else enabled
+        self._origin = time.perf_counter()
+        self._histograms = {}
+        self._events = deque(maxlen=MAX_EVENTS)  # (name, phase, start, duration or value, thread id)
+        self._thread_names = {}
+        self._lock = threading.Lock()
+
+    def set_enabled(self, enabled):
+        self.enabled = bool(enabled)
+
+    def span(self, name):
+        """Context manager timing its body as name; a no-op while disabled."""
+        return _Span(self, name) if self.enabled else nullcontext()
+
+    def record(self, name, start, end):
+        """Record a span measured with time.perf_counter()."""
+        thread = threading.current_thread()
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = RollingHistogram()
+            histogram.add(end - start)
+            self._events.append((name, "X", start, end - start, thread.ident))
+            self._thread_names[thread.ident] = thread.name
+
+    def counter(self, name, value):
+        """Record a sampled value (e.g. playback fps) as a Chrome trace counter."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._events.append((name, "C", time.perf_counter(), value, threading.get_ident()))
+
+    def histogram(self, name):
+        return self._histograms.get(name)
+
+    def summary(self):
+        """{name: histogram summary} of everything recorded so far."""
+        with self._lock:
+            return {name: h.summary() for name, h in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._events.clear()
+
+    def export_chrome_trace(self, path):
+        """Write the buffered events as Chrome trace JSON. Returns the number of events written."""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        trace = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                 for tid, name in thread_names.items()]
+        for name, phase, start, value, tid in events:
+            event = {"name": name, "ph": phase, "pid": pid, "tid": tid, "ts": (start - self._origin) * 1e6}
+            if phase == "X":
+                event["dur"] = value * 1e6
+            else:
+                event["args"] = {name: value}
+            trace.append(event)
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+
+TRACER = Tracer()
+
+
+def traced(name=None):
+    """Decorator timing every call of the function as name (default: its qualified name)."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                TRACER.record(label, start, time.perf_counter())
+        return wrapper
+    return decorate
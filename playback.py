@@ -0,0 +1,116 @@
+import math
+import time
+from collections import deque
+from PyQt5.QtCore import QObject, QTimer, Qt, pyqtSignal
+
+SPEEDS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+
+
+class PlaybackEngine(QObject):
+    """
+    Wall-clock playback scheduler. The frame shown at any moment is derived from the time elapsed since
+    play (or the last seek / rate change), so slow decodes make the engine skip ahead instead of
+    drifting. Display is capped at MAX_DISPLAY_FPS; faster rates advance by a stride of several frames.
+    """
+    frame_due = pyqtSignal(int)  # frame index to show now
+    stats_changed = pyqtSignal(float, int)  # achieved display fps, dropped frames since play
+    finished = pyqtSignal()
+
+    MAX_DISPLAY_FPS = 60
+
+    def __init__(self, parent=None, fps=10.0, speed=1.0):
+        super().__init__(parent)
+        self.fps = fps
+        self.speed = speed
+        self.frame_count = 0
+        self.dropped = 0
+        self._playing = False
+        self._origin_idx = 0
+        self._origin_time = 0.0
+        self._last_idx = 0
+        self._shown = deque()  # perf_counter timestamps of frames shown in the last second
+        self._last_stats = 0.0
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._tick)
+
+    @property
+    def rate(self):
+        """Video frames per wall-clock second."""
+        return self.fps * self.speed
+
+    @property
+    def stride(self):
+        """Frames advanced per displayed frame."""
+        return max(1, math.ceil(self.rate / self.MAX_DISPLAY_FPS))
+
+    def is_playing(self):
+        return self._playing
+
+    def achieved_fps(self):
+        return float(len(self._shown))
+
+    def set_fps(self, fps):
+        self.fps = max(float(fps), 0.1)
+        self._rebase(self._last_idx)
+
+    def set_speed(self, speed):
+        self.speed = min(max(float(speed), SPEEDS[0]), SPEEDS[-1])
+        self._rebase(self._last_idx)
+
+    def play(self, start_idx, frame_count):
+        self.frame_count = frame_count
+        if frame_count <= 0 or start_idx >= frame_count - 1:
+            return
+        self.dropped = 0
+        self._shown.clear()
+        self._playing = True
+        self._last_idx = start_idx
+        self._rebase(start_idx)
+        self._schedule(time.perf_counter())
+
+    def pause(self):
+        self._playing = False
+        self._timer.stop()
+
+    def seek(self, idx):
+        """Continue playback from idx (e.g. after the user scrubs while playing)."""
+        self._last_idx = idx
+        self._rebase(idx)
+
+    def _rebase(self, idx):
+        self._origin_idx = idx
+        self._origin_time = time.perf_counter()
+
+    def _schedule(self, now):
+        next_idx = self._last_idx + self.stride
+        deadline = self._origin_time + (next_idx - self._origin_idx) / self.rate
+        self._timer.start(max(0, int((deadline - now) * 1000)))
+
+    def _tick(self):
+        if not self._playing:
+            return
+        now = time.perf_counter()
+        target = self._origin_idx + int((now - self._origin_time) * self.rate)
+        last = self.frame_count - 1
+        if target > last:
+            target = last
+        if target > self._last_idx:
+            # Anything beyond the planned stride was skipped because we were late
+            self.dropped += max(0, target - self._last_idx - self.stride)
+            self._last_idx = target
+            self.frame_due.emit(target)
+            shown = time.perf_counter()
+            self._shown.append(shown)
+            while self._shown and shown - self._shown[0] > 1.0:
+                self._shown.popleft()
+            if shown - self._last_stats >= 0.25:
+                self._last_stats = shown
+                self.stats_changed.emit(self.achieved_fps(), self.dropped)
+        if self._last_idx >= last:
+            self.pause()
+            self.stats_changed.emit(self.achieved_fps(), self.dropped)
+            self.finished.emit()
+            return
+        self._schedule(time.perf_counter())
@@ -0,0 +1,102 @@
+import sys
+import os
+import argparse
+import numpy as np
+from label_parser import PERSON_HEADER
+from frame_index import frame_name
+
+# Synthetic datasets for benchmarks: label files in the tool's text format and frame folders of small
+# JPEGs. Everything is derived from a seed, so the same arguments always produce the same data.
+
+ACTIONS = ("walking", "sitting", "standing", "raising_hand", "writing", "reading", "talking", "looking_away")
+
+
+def generate_label_file(path, persons=20, ranges=200, frames=10000, first_person=1, seed=0):
+    """
+    Write persons blocks of ranges entries each, spread over [0, frames). Ranges are in random
+    order and may overlap, like hand-made label files. Returns the number of entries written.
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, 'w') as f:
+        for person_id in range(first_person, first_person + persons):
+            starts = rng.integers(0, max(frames, 1), ranges)
+            ends = np.minimum(starts + rng.integers(0, max(frames // 20, 1), ranges), max(frames - 1, 0))
+            actions = rng.integers(0, len(ACTIONS), ranges)
+            f.write(PERSON_HEADER.format(person_id))
+            f.writelines(f"{ACTIONS[a]}: {s} - {e}\n" for a, s, e in zip(actions.tolist(), starts.tolist(), ends.tolist()))
+    return persons * ranges
+
+
+def _jpeg_variants(size, count):
+    """count distinct JPEG encodings of size (width, height), so decoding is not trivially cached."""
+    from PyQt5.QtGui import QImage, QColor
+    from PyQt5.QtCore import QBuffer, QByteArray, QIODevice
+    width, height = size
+    variants = []
+    for i in range(count):
+        image = QImage(width, height, QImage.Format_RGB32)
+        image.fill(QColor.fromHsv((i * 47) % 360, 160, 200))
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.WriteOnly)
+        image.save(buffer, "JPG", 85)
+        buffer.close()
+        variants.append(bytes(data))
+    return variants
+
+
+def generate_frame_folder(folder, frames=1000, size=(320, 240), gap_every=0, seed=0):
+    """
+    Write frames frame_XXXXXX.jpg files to folder. With gap_every, every gap_every-th frame number is
+    skipped, as in folders where frames were dropped. Returns the frame numbers written.
+    """
+    os.makedirs(folder, exist_ok=True)
+    variants = _jpeg_variants(size, 8)
+    rng = np.random.default_rng(seed)
+    numbers = np.arange(2 * frames if gap_every > 1 else frames)
+    if gap_every > 1:
+        numbers = numbers[numbers % gap_every != gap_every - 1][:frames]
+    for number, variant in zip(numbers.tolist(), rng.integers(0, len(variants), len(numbers)).tolist()):
+        with open(os.path.join(folder, frame_name(number)), 'wb') as f:
+            f.write(variants[variant])
+    return numbers
+
+
+def generate_dataset(root, persons=20, ranges=200, frames=1000, label_files=2, size=(320, 240), seed=0):
+    """
+    A frame folder plus label_files label files with consecutive person id blocks, as used by the
+    benchmarks. Returns {"frames": folder, "labels": [paths]}.
+    """
+    os.makedirs(root, exist_ok=True)
+    folder = os.path.join(root, "frames")
+    generate_frame_folder(folder, frames, size, seed=seed)
+    paths = []
+    for i in range(label_files):
+        path = os.path.join(root, f"labels_{i}.txt")
+        generate_label_file(path, persons, ranges, frames, first_person=1 + i * persons, seed=seed + i)
+        paths.append(path)
+    return {"frames": folder, "labels": paths}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic label files and frame folders.")
+    parser.add_argument("root", help="output directory")
+    parser.add_argument("--persons", type=int, default=20, help="persons per label file")
+    parser.add_argument("--ranges", type=int, default=200, help="ranges per person")
+    parser.add_argument("--frames", type=int, default=1000)
+    parser.add_argument("--label-files", type=int, default=2)
+    parser.add_argument("--size", default="320x240", help="frame size WIDTHxHEIGHT")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    try:
+        size = tuple(int(v) for v in args.size.lower().split("x", 1))
+    except ValueError:
+        parser.error(f"Invalid frame size {args.size!r}, expected e.g. 320x240")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    dataset = generate_dataset(args.root, args.persons, args.ranges, args.frames, args.label_files, size, args.seed)
+    print(f"Wrote {args.frames} frames to {dataset['frames']} and {len(dataset['labels'])} label files")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
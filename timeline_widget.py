@@ -0,0 +1,133 @@
+import colorsys
+import numpy as np
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtGui import QImage, QPainter, QColor, QPen
+from PyQt5.QtCore import Qt, pyqtSignal
+from label_raster import EMPTY, rasterize_ranges
+
+
+def label_palette(count):
+    """count well-spread RGB32 colors (golden-ratio hues), as a uint32 array indexed by label id."""
+    colors = np.empty(count + 1, dtype=np.uint32)
+    colors[-1] = 0xFF2B2B2B  # index EMPTY (-1) is the background
+    for i in range(count):
+        r, g, b = colorsys.hsv_to_rgb((i * 0.618033988749895) % 1.0, 0.65, 0.95)
+        colors[i] = 0xFF000000 | (int(r * 255) << 16) | (int(g * 255) << 8) | int(b * 255)
+    return colors
+
+
+class LabelTimeline(QWidget):
+    """
+    Strip under the frame slider showing every person's label ranges as colored bands, one lane per
+    person. The bands come from a cached (persons x pixels) label-id raster; edits re-rasterize only
+    the edited person's lane and frame changes only move the playhead.
+    """
+    frame_clicked = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(40)
+        self.setMaximumHeight(120)
+        self.labels_by_id = {}
+        self.person_ids = []
+        self.selected_person_id = None
+        self.first_frame = 0
+        self.last_frame = 0
+        self.current_frame = None
+        self._rows = {}  # {person_id: lane index}
+        self._raster = np.full((0, 0), EMPTY, dtype=np.int32)
+        self._palette = label_palette(0)
+        self._image = None
+
+    def set_frame_range(self, first_frame, last_frame):
+        self.first_frame = first_frame
+        self.last_frame = last_frame
+        self.rebuild()
+
+    def set_labels(self, labels_by_id, person_ids):
+        self.labels_by_id = labels_by_id
+        self.person_ids = list(person_ids)
+        self.rebuild()
+
+    def set_current_frame(self, frame_num):
+        self.current_frame = frame_num
+        self.update()
+
+    def set_selected_person(self, person_id):
+        self.selected_person_id = person_id
+        self.update()
+
+    def _lane_order(self):
+        known = set(self.person_ids)
+        return self.person_ids + [p for p in self.labels_by_id if p not in known]
+
+    def rebuild(self):
+        order = self._lane_order()
+        self._rows = {person_id: i for i, person_id in enumerate(order)}
+        self._raster = np.full((len(order), max(self.width(), 1)), EMPTY, dtype=np.int32)
+        for person_id in order:
+            self._rasterize(person_id)
+        self._render()
+
+    def update_person(self, person_id):
+        """Re-rasterize one person's lane after an edit."""
+        if person_id not in self._rows:
+            self.rebuild()
+            return
+        self._rasterize(person_id)
+        self._render()
+
+    def _rasterize(self, person_id):
+        table = self.labels_by_id.get(person_id)
+        if table is None:
+            self._raster[self._rows[person_id]] = EMPTY
+            return
+        self._raster[self._rows[person_id]] = rasterize_ranges(
+            table.starts, table.ends, table.label_ids, self.first_frame, self.last_frame, self._raster.shape[1])
+
+    def _render(self):
+        if self._raster.size == 0:
+            self._image = None
+            self.update()
+            return
+        count = int(self._raster.max()) + 1
+        if len(self._palette) - 1 < count:
+            self._palette = label_palette(max(count, 2 * (len(self._palette) - 1)))
+        pixels = np.ascontiguousarray(self._palette[self._raster])
+        height, width = pixels.shape
+        image = QImage(pixels.data, width, height, width * 4, QImage.Format_RGB32)
+        self._image = image.copy()  # detach from the numpy buffer
+        self.update()
+
+    def resizeEvent(self, event):
+        if event.size().width() != event.oldSize().width():
+            self.rebuild()
+        super().resizeEvent(event)
+
+    def _frame_at(self, x):
+        span = self.last_frame - self.first_frame + 1
+        return self.first_frame + int(x * span / max(self.width(), 1))
+
+    def _x_at(self, frame_num):
+        span = max(self.last_frame - self.first_frame + 1, 1)
+        return int((frame_num - self.first_frame) * self.width() / span)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor(0x2B, 0x2B, 0x2B))
+        if self._image is not None:
+            painter.drawImage(self.rect(), self._image)
+            row = self._rows.get(self.selected_person_id)
+            if row is not None:
+                lane = self.height() / self._image.height()
+                painter.setPen(QPen(QColor(255, 255, 255, 160)))
+                painter.drawRect(0, int(row * lane), self.width() - 1, max(int(lane), 1))
+        if self.current_frame is not None:
+            painter.setPen(QPen(QColor(255, 60, 60), 2))
+            x = self._x_at(self.current_frame)
+            painter.drawLine(x, 0, x, self.height())
+        painter.end()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.last_frame >= self.first_frame:
+            self.frame_clicked.emit(self._frame_at(event.x()))
@@ -1,52 +1,98 @@
 import sys
 import os
-import re
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout,
-    QFileDialog, QListWidget, QLineEdit, QMessageBox, QSlider
+    QFileDialog, QListWidget, QLineEdit, QMessageBox, QSlider, QInputDialog, QComboBox, QSpinBox, QShortcut,
+    QMenuBar, QAction
 )
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt, QTimer
-
-class LabelEntry:
-    def __init__(self, person_id, label, start, end):
-        self.person_id = person_id
-        self.label = label
-        self.start = int(start)
-        self.end = int(end)
-    def __str__(self):
-        return f"{self.label}: {self.start} - {self.end}"
+from PyQt5.QtGui import QImage, QPixmap, QKeySequence
+from PyQt5.QtCore import Qt, QTimer, pyqtSlot, pyqtSignal
+from interval_index import IntervalIndex
+from frame_cache import FrameCache
+from frame_pack import FramePack, is_frame_pack, PACK_EXTENSION
+from frame_index import FrameIndex, frame_name
+from label_journal import LabelJournal, load_with_journal, write_labels_atomic, file_base
+from label_store import LabelStore, is_label_store
+from timeline_widget import LabelTimeline
+from playback import PlaybackEngine, SPEEDS
+from label_table import LabelEntry, LabelTable
+from batch_ops import (
+    apply_batch, parse_person_ids, insert_row_diff, set_row_diff, delete_row_diff
+)
+from edit_history import UndoStack
+from perf_trace import TRACER, traced
+from video_session import VideoSession
+from label_export import export_labels
 
 class VideoLabeler(QWidget):
+    session_video_loaded = pyqtSignal(int)  # emitted from a loader thread, delivered on the GUI thread
+    frame_preview_ready = pyqtSignal(int, QImage)  # (scan id, first frame), from the folder scan thread
+    frames_scanned = pyqtSignal(int)  # scan id, from the folder scan thread
+    COMPACT_EVERY = 500  # journal records before an automatic background compaction
+    BATCH_OPERATIONS = (
+        ("Relabel overlapping entries", "replace"),
+        ("Relabel range (split at bounds)", "relabel"),
+        ("Split at bounds", "split"),
+        ("Clip to range", "clip"),
+        ("Shift range by offset", "shift"),
+        ("Delete range", "delete"),
+        ("Merge adjacent ranges", "merge"),
+    )
+
     def replace_label_in_frame_range(self, person_id, start_frame, end_frame, new_label):
         """
-        For the given person_id, replace the label of all LabelEntry objects whose range overlaps
+        For the given person_id, replace the label of all label entries whose range overlaps
         with [start_frame, end_frame] (inclusive) with new_label. Do not merge ranges, just change the label.
         """
-        if person_id not in self.labels_by_id:
-            return
-        labels = self.labels_by_id[person_id]
-        for entry in labels:
-            # Check if entry overlaps with the given frame range
-            if entry.end >= start_frame and entry.start <= end_frame:
-                entry.label = new_label
-        self.update_label_list()
+        self.apply_batch_operation([person_id], "replace", start_frame, end_frame, new_label)
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Video Action Labeling Tool")
         self.frame_folder = None
         self.label_file = None
-        self.labels_by_id = {}  # {person_id: [LabelEntry, ...]}
+        self.labels_by_id = {}  # {person_id: LabelTable}
+        self.label_index = {}  # {person_id: IntervalIndex}, built lazily per person
+        self.current_matches = []  # LabelEntry objects shown in label_list
+        self.dirty_person_ids = set()  # persons edited since the last compaction
+        self.history = UndoStack()  # undo/redo of label edits as row diffs
+        self.journal = None  # LabelJournal for label_file
+        self.label_store = None  # LabelStore when label_file is a SQLite store
+        self.store_video = None  # video name inside label_store
+        self.compaction = None  # Future of the running background compaction
+        self.save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="label-save")
+        self.scan_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="frame-scan")
+        self.frame_scan = None  # Future of the running frame folder scan
+        self.frame_scan_id = 0  # bumped per scan so a superseded scan's signals are ignored
         self.person_ids = []
         self.selected_person_id = None
-        self.frames = []
+        self.frame_index = FrameIndex()
+        self.frame_pack = None
+        self.session = None  # VideoSession in session mode
+        self.session_idx = -1  # index of the video being shown (or loaded) in session mode
         self.current_frame_idx = 0
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.next_frame)
+        self.frame_cache = FrameCache()
+        self.playback = PlaybackEngine(self)
+        self.playback.frame_due.connect(self.show_frame_index)
+        self.playback.stats_changed.connect(self.playback_stats_changed)
+        self.session_video_loaded.connect(self.show_session_video)
+        # Queued even when emitted on the GUI thread (a scan already done when its callback is added)
+        self.frame_preview_ready.connect(self.show_frame_preview, Qt.QueuedConnection)
+        self.frames_scanned.connect(self.finish_frame_scan, Qt.QueuedConnection)
         self.init_ui()
 
     def init_ui(self):
         layout = QVBoxLayout()
+        menu_bar = QMenuBar()
+        view_menu = menu_bar.addMenu("View")
+        self.perf_overlay_action = QAction("Performance Overlay", self, checkable=True)
+        self.perf_overlay_action.setChecked(TRACER.enabled)
+        self.perf_overlay_action.toggled.connect(self.set_perf_overlay)
+        view_menu.addAction(self.perf_overlay_action)
+        export_trace_action = QAction("Export Chrome Trace...", self)
+        export_trace_action.triggered.connect(self.export_trace)
+        view_menu.addAction(export_trace_action)
+        layout.setMenuBar(menu_bar)
         # Add current frame indicator
         self.frame_num_label = QLabel("Frame: N/A")
         self.frame_num_label.setAlignment(Qt.AlignCenter)
@@ -54,33 +100,76 @@ class VideoLabeler(QWidget):
 
         btn_layout = QHBoxLayout()
         self.select_folder_btn = QPushButton("Select Frame Folder")
+        self.select_pack_btn = QPushButton("Select Frame Pack")
         self.load_frames_btn = QPushButton("Load Frames")
         self.select_label_btn = QPushButton("Select Label File")
         self.load_labels_btn = QPushButton("Load Labels")
         btn_layout.addWidget(self.select_folder_btn, 1)
+        btn_layout.addWidget(self.select_pack_btn, 1)
         btn_layout.addWidget(self.load_frames_btn, 1)
         btn_layout.addWidget(self.select_label_btn, 1)
         btn_layout.addWidget(self.load_labels_btn, 1)
         layout.addLayout(btn_layout)
 
+        # Session mode: a folder of videos, switched with prev/next or the dropdown
+        session_layout = QHBoxLayout()
+        self.open_session_btn = QPushButton("Open Session Folder")
+        self.prev_video_btn = QPushButton("< Prev Video")
+        self.video_combo = QComboBox()
+        self.next_video_btn = QPushButton("Next Video >")
+        self.session_status_label = QLabel("")
+        for widget in (self.prev_video_btn, self.video_combo, self.next_video_btn):
+            widget.setEnabled(False)
+        session_layout.addWidget(self.open_session_btn, 1)
+        session_layout.addWidget(self.prev_video_btn)
+        session_layout.addWidget(self.video_combo, 2)
+        session_layout.addWidget(self.next_video_btn)
+        session_layout.addWidget(self.session_status_label, 1)
+        layout.addLayout(session_layout)
+
         self.image_label = QLabel("No frame loaded")
         self.image_label.setAlignment(Qt.AlignCenter)
         self.image_label.setMinimumSize(320, 240)
         layout.addWidget(self.image_label, stretch=4)
 
+        # Timing overlay in the corner of the frame, see perf_trace
+        self.perf_overlay = QLabel(self.image_label)
+        self.perf_overlay.setStyleSheet("background: rgba(0, 0, 0, 160); color: #9f9; font-family: monospace; padding: 4px;")
+        self.perf_overlay.move(4, 4)
+        self.perf_overlay.setVisible(TRACER.enabled)
+        self.perf_timer = QTimer(self)
+        self.perf_timer.setInterval(500)
+        self.perf_timer.timeout.connect(self.update_perf_overlay)
+        if TRACER.enabled:
+            self.perf_timer.start()
+
         self.slider = QSlider(Qt.Horizontal)
         self.slider.valueChanged.connect(self.slider_changed)
         layout.addWidget(self.slider)
 
+        self.timeline = LabelTimeline()
+        self.timeline.frame_clicked.connect(self.timeline_clicked)
+        layout.addWidget(self.timeline)
+
         control_layout = QHBoxLayout()
         self.play_btn = QPushButton("Play")
         self.pause_btn = QPushButton("Pause")
+        self.fps_spin = QSpinBox()
+        self.fps_spin.setRange(1, 240)
+        self.fps_spin.setValue(int(self.playback.fps))
+        self.fps_spin.setSuffix(" fps")
+        self.speed_combo = QComboBox()
+        self.speed_combo.addItems([f"{speed:g}x" for speed in SPEEDS])
+        self.speed_combo.setCurrentIndex(SPEEDS.index(1.0))
+        self.playback_stats_label = QLabel("")
         control_layout.addWidget(self.play_btn, 1)
         control_layout.addWidget(self.pause_btn, 1)
+        control_layout.addWidget(self.fps_spin)
+        control_layout.addWidget(self.speed_combo)
+        control_layout.addWidget(self.playback_stats_label, 1)
         layout.addLayout(control_layout)
 
         # Dropdown for person ID selection
-        from PyQt5.QtWidgets import QComboBox
         self.id_dropdown = QComboBox()
         self.id_dropdown.currentIndexChanged.connect(self.person_id_changed)
         layout.addWidget(QLabel("Select Person ID:"))
@@ -106,79 +195,250 @@ class VideoLabeler(QWidget):
         edit_layout.addWidget(self.delete_label_btn, 1)
         layout.addLayout(edit_layout)
 
-        # UI for batch label replacement
+        # UI for batch operations over a frame range
         batch_layout = QHBoxLayout()
+        self.batch_op_combo = QComboBox()
+        self.batch_op_combo.addItems([title for title, _ in self.BATCH_OPERATIONS])
         self.batch_start_edit = QLineEdit()
         self.batch_start_edit.setPlaceholderText("Start Frame")
         self.batch_end_edit = QLineEdit()
         self.batch_end_edit.setPlaceholderText("End Frame")
         self.batch_label_edit = QLineEdit()
-        self.batch_label_edit.setPlaceholderText("New Label Action")
-        self.batch_replace_btn = QPushButton("Replace Label in Range")
-        batch_layout.addWidget(QLabel("Batch Replace:"))
+        self.batch_label_edit.setPlaceholderText("New Label Action / Offset")
+        self.batch_persons_edit = QLineEdit()
+        self.batch_persons_edit.setPlaceholderText("Persons: selected, all or 1-5,8")
+        self.batch_replace_btn = QPushButton("Apply")
+        batch_layout.addWidget(QLabel("Batch:"))
+        batch_layout.addWidget(self.batch_op_combo, 2)
         batch_layout.addWidget(self.batch_start_edit, 1)
         batch_layout.addWidget(self.batch_end_edit, 1)
         batch_layout.addWidget(self.batch_label_edit, 2)
+        batch_layout.addWidget(self.batch_persons_edit, 2)
         batch_layout.addWidget(self.batch_replace_btn, 1)
         layout.addLayout(batch_layout)
 
+        save_layout = QHBoxLayout()
+        self.undo_btn = QPushButton("Undo")
+        self.redo_btn = QPushButton("Redo")
         self.save_btn = QPushButton("Save Labels")
-        layout.addWidget(self.save_btn)
+        self.export_btn = QPushButton("Export Arrays")
+        save_layout.addWidget(self.undo_btn, 1)
+        save_layout.addWidget(self.redo_btn, 1)
+        save_layout.addWidget(self.save_btn, 3)
+        save_layout.addWidget(self.export_btn, 1)
+        layout.addLayout(save_layout)
+        self.update_history_buttons()
 
         self.setLayout(layout)
 
         self.select_folder_btn.clicked.connect(self.select_folder)
+        self.select_pack_btn.clicked.connect(self.select_frame_pack)
         self.load_frames_btn.clicked.connect(self.load_frames)
         self.select_label_btn.clicked.connect(self.select_label_file)
         self.load_labels_btn.clicked.connect(self.load_labels)
+        self.open_session_btn.clicked.connect(self.open_session)
+        self.prev_video_btn.clicked.connect(lambda: self.switch_video(self.session_idx - 1))
+        self.next_video_btn.clicked.connect(lambda: self.switch_video(self.session_idx + 1))
+        self.video_combo.currentIndexChanged.connect(self.switch_video)
         self.play_btn.clicked.connect(self.play)
         self.pause_btn.clicked.connect(self.pause)
+        self.fps_spin.valueChanged.connect(self.playback.set_fps)
+        self.speed_combo.currentIndexChanged.connect(lambda i: self.playback.set_speed(SPEEDS[i]))
         self.add_label_btn.clicked.connect(self.add_edit_label)
         self.delete_label_btn.clicked.connect(self.delete_label)
         self.save_btn.clicked.connect(self.save_labels)
+        self.export_btn.clicked.connect(self.export_arrays)
         self.label_list.itemClicked.connect(self.label_selected)
 
         self.batch_replace_btn.clicked.connect(self.batch_replace_label_action)
+        self.undo_btn.clicked.connect(self.undo)
+        self.redo_btn.clicked.connect(self.redo)
+        QShortcut(QKeySequence.Undo, self, self.undo)
+        QShortcut(QKeySequence.Redo, self, self.redo)
     def batch_replace_label_action(self):
         start_text = self.batch_start_edit.text().strip()
         end_text = self.batch_end_edit.text().strip()
         label_text = self.batch_label_edit.text().strip()
-        if not start_text.isdigit() or not end_text.isdigit() or not label_text:
-            QMessageBox.warning(self, "Invalid Input", "Please enter valid start/end frame and label action.")
+        _, operation = self.BATCH_OPERATIONS[self.batch_op_combo.currentIndex()]
+        if not start_text.isdigit() or not end_text.isdigit():
+            QMessageBox.warning(self, "Invalid Input", "Please enter valid start/end frames.")
+            return
+        if operation in ("replace", "relabel") and not label_text:
+            QMessageBox.warning(self, "Invalid Input", "Please enter the new label action.")
             return
+        offset = 0
+        if operation == "shift":
+            try:
+                offset = int(label_text)
+            except ValueError:
+                QMessageBox.warning(self, "Invalid Input", "Please enter the frame offset to shift by.")
+                return
         start_frame = int(start_text)
         end_frame = int(end_text)
         if start_frame > end_frame:
             QMessageBox.warning(self, "Invalid Range", "Start frame must be less than or equal to end frame.")
             return
-        person_id = self.selected_person_id or (self.person_ids[0] if self.person_ids else None)
-        if not person_id:
+        persons_text = self.batch_persons_edit.text().strip()
+        if not persons_text or persons_text.lower() == "selected":
+            person_id = self.selected_person_id or (self.person_ids[0] if self.person_ids else None)
+            person_ids = [person_id] if person_id else []
+        else:
+            try:
+                person_ids = parse_person_ids(persons_text, self._person_order())
+            except ValueError:
+                QMessageBox.warning(self, "Invalid Input", "Persons must be 'all' or ids like 1-5,8.")
+                return
+        if not person_ids:
             QMessageBox.warning(self, "No Person Selected", "Please select a person ID.")
             return
-        self.replace_label_in_frame_range(person_id, start_frame, end_frame, label_text)
-        QMessageBox.information(self, "Batch Replace", "Labels updated for selected person in given frame range.")
+        diffs = self.apply_batch_operation(person_ids, operation, start_frame, end_frame, label_text, offset)
+        QMessageBox.information(self, "Batch", f"{self.batch_op_combo.currentText()}: "
+                                f"{sum(len(d.removed) for d in diffs)} ranges changed for {len(diffs)} persons.")
+
+    def _person_order(self):
+        known = set(self.person_ids)
+        return self.person_ids + [p for p in self.labels_by_id if p not in known]
+
+    def apply_batch_operation(self, person_ids, operation, start_frame, end_frame, label=None, offset=0):
+        """
+        Scripting entry point: apply a batch_ops operation to person_ids over [start_frame, end_frame].
+        The whole batch is journaled as row diffs and undone as one unit.
+        """
+        self.ensure_labels_loaded(person_ids)
+        diffs = apply_batch(self.labels_by_id, person_ids, operation, start_frame, end_frame, label, offset)
+        self._record_diffs(diffs)
+        self.push_history(f"{operation} {start_frame}-{end_frame}", diffs)
+        self.update_label_list()
+        return diffs
+
+    def push_history(self, text, diffs):
+        self.history.push(text, diffs)
+        self.update_history_buttons()
+
+    def update_history_buttons(self):
+        self.undo_btn.setEnabled(self.history.can_undo())
+        self.redo_btn.setEnabled(self.history.can_redo())
+        self.undo_btn.setToolTip(f"Undo {self.history.undo_text()}" if self.history.can_undo() else "")
+        self.redo_btn.setToolTip(f"Redo {self.history.redo_text()}" if self.history.can_redo() else "")
+
+    def undo(self):
+        command = self.history.undo(self.labels_by_id)
+        if command is not None:
+            self._record_diffs([diff.inverse() for diff in reversed(command.diffs)])
+            self.update_label_list()
+        self.update_history_buttons()
+
+    def redo(self):
+        command = self.history.redo(self.labels_by_id)
+        if command is not None:
+            self._record_diffs(command.diffs)
+            self.update_label_list()
+        self.update_history_buttons()
+
+    def _record_diffs(self, diffs):
+        for diff in diffs:
+            self.label_index.pop(diff.person_id, None)  # rebuilt lazily from the new rows
+            self.record_edit("diff", diff.person_id, **diff.to_record(self.labels_by_id[diff.person_id]))
 
     def select_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Frame Folder")
         if folder:
             self.frame_folder = folder
 
+    def select_frame_pack(self):
+        file, _ = QFileDialog.getOpenFileName(self, "Select Frame Pack", filter=f"Frame Packs (*{PACK_EXTENSION})")
+        if file:
+            self.frame_folder = file
+
     def select_label_file(self):
-        file, _ = QFileDialog.getOpenFileName(self, "Select Label File", filter="Text Files (*.txt)")
+        file, _ = QFileDialog.getOpenFileName(self, "Select Label File", filter="Label Files (*.txt *.sqlite *.db)")
         if file:
             self.label_file = file
 
-    def load_frames(self):
+    @pyqtSlot()
+    def load_frames(self, wait=False):
+        """Index self.frame_folder; a folder is scanned on the scan thread unless wait is set."""
         if not self.frame_folder:
             QMessageBox.warning(self, "Missing Input", "Please select a frame folder.")
             return
-        self.frames = sorted([f for f in os.listdir(self.frame_folder) if re.match(r"frame_\d{6}\.jpg", f)])
+        self.close_session()  # picking frames by hand leaves session mode
+        self.pause()
+        if self.frame_pack is not None:
+            self.frame_cache.reset(None, 0)
+            self.frame_pack.close()
+            self.frame_pack = None
+        if is_frame_pack(self.frame_folder):
+            frame_pack = FramePack(self.frame_folder)
+            self.set_frames(FrameIndex(frame_pack.frame_numbers), frame_pack)
+            return
+        future = self.scan_frames(self.frame_folder)
+        if wait:
+            future.result()
+            self.finish_frame_scan(self.frame_scan_id)
+
+    def scan_frames(self, folder):
+        """
+        Start listing folder off the GUI thread and return the Future. Its first frame is shown as
+        soon as the scan finds it; the frames are swapped in by finish_frame_scan.
+        """
+        self.frame_scan_id += 1
+        scan_id = self.frame_scan_id
+        # Nothing of the previous frames may be shown or labeled while the new folder is listed
+        self.frame_cache.reset(None, 0)
+        self.frame_index = FrameIndex()
+        self.slider.setMaximum(0)
+        self.current_frame_idx = 0
+        self.image_label.setText("Scanning frames...")
+        self.frame_scan = self.scan_executor.submit(self._scan_folder, folder, scan_id)
+        self.frame_scan.add_done_callback(lambda f: self.frames_scanned.emit(scan_id))
+        return self.frame_scan
+
+    def _scan_folder(self, folder, scan_id):
+        # Runs on scan_executor; the preview is decoded here and handed to the GUI thread by signal
+        def preview(number):
+            image = QImage(os.path.join(folder, frame_name(number)))
+            if not image.isNull():
+                width, height = self.frame_cache.size
+                self.frame_preview_ready.emit(scan_id, image.scaled(width, height, Qt.KeepAspectRatio))
+
+        if os.path.exists(os.path.join(folder, frame_name(0))):
+            preview(0)
+            return folder, FrameIndex.from_folder(folder)
+        return folder, FrameIndex.from_folder(folder, preview)
+
+    def show_frame_preview(self, scan_id, image):
+        if self.frame_scan is not None and scan_id == self.frame_scan_id:
+            self.image_label.setPixmap(QPixmap.fromImage(image))
+
+    def finish_frame_scan(self, scan_id):
+        if self.frame_scan is None or scan_id != self.frame_scan_id:
+            return  # superseded by another load, or already finished by load_frames(wait=True)
+        future, self.frame_scan = self.frame_scan, None
+        if future.exception() is not None:
+            self.image_label.setText("No frames found.")
+            QMessageBox.warning(self, "Load Failed", f"Could not list frames: {future.exception()}")
+            return
+        self.frame_folder, frame_index = future.result()
+        self.set_frames(frame_index)
+
+    def set_frames(self, frame_index, frame_pack=None):
+        """Show frames of self.frame_folder, already indexed (frame_pack when it is a pack)."""
+        self.pause()  # the engine was started with the old frame count
+        self.frame_scan = None  # a pending folder scan is superseded
+        self.frame_index = frame_index
+        self.frame_pack = frame_pack
         print(f"Loaded frame folder: {self.frame_folder}")
-        print(f"Number of frames found: {len(self.frames)}")
-        if self.frames:
-            print(f"First frame: {self.frames[0]}")
-            print(f"Last frame: {self.frames[-1]}")
-            self.slider.setMaximum(len(self.frames) - 1)
+        print(f"Number of frames found: {len(self.frame_index)}")
+        if self.frame_index:
+            print(f"First frame: {self.frame_index.name(0)}")
+            print(f"Last frame: {self.frame_index.name(-1)}")
+            if self.frame_pack is not None:
+                self.frame_cache.reset(self.frame_pack.load_image, len(self.frame_index))
+            else:
+                folder, numbers = self.frame_folder, self.frame_index.numbers
+                self.frame_cache.reset(lambda idx: QImage(os.path.join(folder, frame_name(numbers[idx]))), len(numbers))
+            self.slider.setMaximum(len(self.frame_index) - 1)
+            self.timeline.set_frame_range(self.frame_index.number(0), self.frame_index.number(-1))
             self.current_frame_idx = 0
             self.load_frame()
         else:
@@ -186,80 +446,254 @@ class VideoLabeler(QWidget):
             self.image_label.setText("No frames found.")
             self.slider.setMaximum(0)
             self.current_frame_idx = 0
-            self.frames = []
+            self.frame_index = FrameIndex()
             self.update_label_list()
 
     def load_labels(self):
         if not self.label_file:
             QMessageBox.warning(self, "Missing Input", "Please select a label file.")
             return
-        self.labels_by_id = self.parse_label_file(self.label_file)
+        self.close_journal()
+        self.close_label_store()
+        if is_label_store(self.label_file):
+            self.label_store = LabelStore(self.label_file)
+            self.store_video = self.choose_store_video()
+            if self.store_video is None:
+                self.close_label_store()
+                return
+            # Only person ids for now; a person's ranges are read from the store when first viewed
+            self.labels_by_id = {}
+            self.person_ids = self.label_store.person_ids(self.store_video)
+            self.dirty_person_ids = set()
+        else:
+            self.set_labels(*load_with_journal(self.label_file))
+            return
+        self.show_labels()
+
+    def set_labels(self, labels_by_id, recovered=()):
+        """Show labels parsed from the text file self.label_file and journal edits to it."""
+        self.labels_by_id = labels_by_id
+        self.journal = LabelJournal(self.label_file)
+        self.dirty_person_ids = set(recovered)
+        if recovered:
+            print(f"Recovered unsaved edits for person IDs: {sorted(recovered, key=int)}")
         self.person_ids = list(self.labels_by_id.keys())
+        self.show_labels()
+
+    def show_labels(self):
+        self.label_index = {}
+        self.history.clear()
+        self.update_history_buttons()
+        self.selected_person_id = self.person_ids[0] if self.person_ids else None
+        self.ensure_labels_loaded([self.selected_person_id])
+        self.timeline.set_labels(self.labels_by_id, self.person_ids)
         self.id_dropdown.clear()
         self.id_dropdown.addItems(self.person_ids)
-        self.selected_person_id = self.person_ids[0] if self.person_ids else None
         print(f"Loaded label file: {self.label_file}")
         print(f"Person IDs found: {self.person_ids}")
         self.update_label_list()
 
+    def open_session(self):
+        root = QFileDialog.getExistingDirectory(self, "Select Session Folder")
+        if root:
+            self.start_session(root)
+
+    def start_session(self, root):
+        self.close_session()
+        self.frame_scan = None  # a folder still being scanned is not shown once the session is open
+        session = VideoSession(root)
+        if not len(session):
+            session.shutdown()
+            QMessageBox.warning(self, "No Videos Found", "The folder contains no frame folders or frame packs.")
+            return
+        self.session = session
+        self.video_combo.blockSignals(True)
+        self.video_combo.clear()
+        self.video_combo.addItems(session.names())
+        self.video_combo.blockSignals(False)
+        for widget in (self.prev_video_btn, self.video_combo, self.next_video_btn):
+            widget.setEnabled(True)
+        self.switch_video(0)
+
+    def switch_video(self, idx):
+        """Show session video idx now if it is cached, otherwise as soon as its loader finishes."""
+        if self.session is None or not 0 <= idx < len(self.session) or idx == self.session_idx:
+            return
+        self.pause()
+        self.session_idx = idx
+        self.video_combo.blockSignals(True)
+        self.video_combo.setCurrentIndex(idx)
+        self.video_combo.blockSignals(False)
+        future = self.session.get(idx)
+        if future.done():
+            self.show_session_video(idx)
+        else:
+            self.session_status_label.setText(f"Loading {self.session.videos[idx].name}...")
+            future.add_done_callback(lambda f: self.session_video_loaded.emit(idx))
+        self.session.prefetch(idx)
+
+    def show_session_video(self, idx):
+        if self.session is None or idx != self.session_idx:
+            return  # the user has moved on to another video meanwhile
+        future = self.session.get(idx)
+        if future.exception() is not None:
+            self.session_status_label.setText("")
+            QMessageBox.warning(self, "Load Failed", f"Could not load {self.session.videos[idx].name}: {future.exception()}")
+            return
+        loaded = future.result()
+        # Flush the previous video's edits before its files can be read again by a loader
+        self.close_journal()
+        self.close_label_store()
+        self.frame_folder = loaded.video.frame_source
+        self.label_file = loaded.video.label_file
+        self.set_frames(loaded.frame_index, loaded.frame_pack)
+        self.set_labels(loaded.labels_by_id, loaded.recovered)
+        self.session.pin(idx)
+        self.session_status_label.setText(f"{idx + 1}/{len(self.session)}")
+
+    def close_session(self):
+        if self.session is None:
+            return
+        self.close_journal()
+        if self.frame_pack is not None:
+            # The session owns its frame packs; stop decoding from them before they are closed
+            self.frame_cache.reset(None, 0)
+            self.frame_pack = None
+            self.frame_index = FrameIndex()
+        self.session.shutdown()
+        self.session = None
+        self.session_idx = -1
+        self.video_combo.blockSignals(True)
+        self.video_combo.clear()
+        self.video_combo.blockSignals(False)
+        for widget in (self.prev_video_btn, self.video_combo, self.next_video_btn):
+            widget.setEnabled(False)
+        self.session_status_label.setText("")
+
+    def choose_store_video(self):
+        videos = self.label_store.videos()
+        if not videos:
+            QMessageBox.warning(self, "Empty Store", "The selected label store contains no videos.")
+            return None
+        folder_name = os.path.splitext(os.path.basename(self.frame_folder or ""))[0]
+        if folder_name in videos:
+            return folder_name
+        if len(videos) == 1:
+            return videos[0]
+        video, ok = QInputDialog.getItem(self, "Select Video", "Video in label store:", videos, 0, False)
+        return video if ok else None
+
+    def ensure_labels_loaded(self, person_ids=None):
+        """In store mode, read the given persons (default: all) from the store if not loaded yet."""
+        if self.label_store is None:
+            return
+        for person_id in self.person_ids if person_ids is None else person_ids:
+            if person_id is not None and person_id not in self.labels_by_id and person_id in self.person_ids:
+                self.labels_by_id[person_id] = self.label_store.load_person(self.store_video, person_id)
+                self.timeline.update_person(person_id)
+
+    def close_label_store(self):
+        if self.label_store is None:
+            return
+        self.save_to_store()
+        self.label_store.close()
+        self.label_store = None
+        self.store_video = None
+
+    def save_to_store(self):
+        dirty = {p: self.labels_by_id[p] for p in self.dirty_person_ids if p in self.labels_by_id}
+        if dirty:
+            self.label_store.save_persons(self.store_video, dirty)
+        self.dirty_person_ids = set()
+
+    @traced("load_frame")
     def load_frame(self):
-        if not self.frame_folder or not self.frames:
+        if not self.frame_folder or not self.frame_index:
             self.image_label.setText("No frames found.")
             return
-        frame_path = os.path.join(self.frame_folder, self.frames[self.current_frame_idx])
-        pixmap = QPixmap(frame_path)
-        self.image_label.setPixmap(pixmap.scaled(640, 480, Qt.KeepAspectRatio))
+        self.image_label.setPixmap(self.frame_cache.get_pixmap(self.current_frame_idx))
+        self.frame_cache.prefetch(self.current_frame_idx, self.playback.stride if self.playback.is_playing() else 1)
+        # The slider follows the frame; don't let it re-enter slider_changed and load the frame twice
+        self.slider.blockSignals(True)
         self.slider.setValue(self.current_frame_idx)
+        self.slider.blockSignals(False)
         frame_num = self.get_current_frame_number()
         self.frame_num_label.setText(f"Frame: {frame_num}")
+        self.timeline.set_current_frame(frame_num)
         self.update_label_list()
 
-    def next_frame(self):
-        if self.current_frame_idx < len(self.frames) - 1:
-            self.current_frame_idx += 1
-            self.load_frame()
-        else:
-            self.timer.stop()
+    def show_frame_index(self, idx):
+        if idx >= len(self.frame_index):
+            return  # a tick queued before the frames were replaced
+        self.current_frame_idx = idx
+        self.load_frame()
 
     def play(self):
-        self.timer.start(100)
+        self.playback.play(self.current_frame_idx, len(self.frame_index))
 
     def pause(self):
-        self.timer.stop()
+        self.playback.pause()
+
+    def playback_stats_changed(self, fps, dropped):
+        self.playback_stats_label.setText(f"{fps:.1f} fps, {dropped} dropped")
+        TRACER.counter("playback_fps", fps)
+
+    def set_perf_overlay(self, enabled):
+        TRACER.set_enabled(enabled)
+        self.perf_overlay.setVisible(enabled)
+        if enabled:
+            self.perf_timer.start()
+            self.update_perf_overlay()
+        else:
+            self.perf_timer.stop()
+
+    def update_perf_overlay(self):
+        def line(title, name):
+            histogram = TRACER.histogram(name)
+            summary = histogram.summary() if histogram is not None else {"count": 0}
+            if not summary["count"]:
+                return f"{title:8s}        -"
+            return f"{title:8s} p50 {summary['p50_ms']:6.2f}  p99 {summary['p99_ms']:6.2f} ms"
+        fps = self.playback.achieved_fps() if self.playback.is_playing() else 0.0
+        self.perf_overlay.setText("\n".join([
+            line("decode", "decode"),
+            line("lookup", "lookup"),
+            line("frame", "load_frame"),
+            f"{'playback':8s} {fps:6.1f} fps, {self.playback.dropped} dropped",
+        ]))
+        self.perf_overlay.adjustSize()
+
+    def export_trace(self):
+        file, _ = QFileDialog.getSaveFileName(self, "Export Chrome Trace", "trace.json", filter="JSON (*.json)")
+        if not file:
+            return
+        count = TRACER.export_chrome_trace(file)
+        QMessageBox.information(self, "Trace Exported", f"Wrote {count} events to {file}.")
 
     def slider_changed(self, value):
         self.current_frame_idx = value
+        if self.playback.is_playing():
+            self.playback.seek(value)
         self.load_frame()
 
-    def parse_label_file(self, path):
-        labels_by_id = {}
-        current_id = None
-        with open(path, 'r') as f:
-            lines = f.readlines()
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            # Only treat as person id if left side before ':' is a number
-            m = re.match(r"(\d+):", line)
-            if m:
-                current_id = m.group(1)
-                if current_id not in labels_by_id:
-                    labels_by_id[current_id] = []
-                continue
-            if current_id and ':' in line:
-                label_part, frame_part = line.rsplit(':', 1)
-                frame_match = re.match(r"\s*(\d+)\s*-\s*(\d+)", frame_part.strip())
-                if frame_match:
-                    start, end = frame_match.groups()
-                    labels_by_id[current_id].append(LabelEntry(current_id, label_part.strip(), start, end))
-        return labels_by_id
+    def get_label_index(self, person_id):
+        index = self.label_index.get(person_id)
+        if index is None:
+            labels = self.labels_by_id.get(person_id, [])
+            index = IntervalIndex((l.start, l.end, l) for l in labels)
+            self.label_index[person_id] = index
+        return index
 
+    @traced("update_label_list")
     def update_label_list(self):
         self.label_list.clear()
         frame_num = self.get_current_frame_number()
-        labels = self.labels_by_id.get(self.selected_person_id, [])
-        matches = [label for label in labels if label.start <= frame_num <= label.end]
+        if self.selected_person_id in self.labels_by_id:
+            with TRACER.span("lookup"):
+                matches = self.get_label_index(self.selected_person_id).stab(frame_num)
+        else:
+            matches = []
+        self.current_matches = matches
         for label in matches:
             self.label_list.addItem(f"{label.person_id} - {label}")
         if matches:
@@ -274,13 +708,9 @@ class VideoLabeler(QWidget):
             self.end_edit.clear()
 
     def get_current_frame_number(self):
-        if not self.frames:
+        if not self.frame_index:
             return 0
-        fname = self.frames[self.current_frame_idx]
-        m = re.match(r"frame_(\d{6})\.jpg", fname)
-        if m:
-            return int(m.group(1))
-        return 0
+        return self.frame_index.number(self.current_frame_idx)
 
     def add_edit_label(self):
         label = self.label_edit.text().strip()
@@ -290,63 +720,144 @@ class VideoLabeler(QWidget):
             QMessageBox.warning(self, "Invalid Input", "Please enter valid label, start, and end.")
             return
         person_id = self.selected_person_id or (self.person_ids[0] if self.person_ids else "1")
+        self.ensure_labels_loaded([person_id])
         new_label = LabelEntry(person_id, label, start, end)
-        labels = self.labels_by_id.setdefault(person_id, [])
-        selected = self.label_list.currentItem()
-        if selected:
-            label_str = selected.text()
-            # Remove ID prefix for comparison
-            label_str = label_str.split(' - ', 1)[-1]
-            for i, l in enumerate(labels):
-                if str(l) == label_str:
-                    labels[i] = new_label
-                    break
-            else:
-                labels.append(new_label)
+        labels = self.labels_by_id.setdefault(person_id, LabelTable(person_id))
+        index = self.get_label_index(person_id)
+        old = self.selected_entry()
+        new = [new_label.label, new_label.start, new_label.end]
+        if old is not None and old.person_id == person_id:
+            diff = set_row_diff(labels, labels.index(old), *new)
+            diff.apply(labels)
+            index.remove(old.start, old.end, old)
+            self.record_edit("edit", person_id, old=[old.label, old.start, old.end], new=new)
+            self.push_history(f"edit {old}", [diff])
         else:
-            labels.append(new_label)
+            diff = insert_row_diff(labels, len(labels), *new)
+            diff.apply(labels)
+            self.record_edit("add", person_id, new=new)
+            self.push_history(f"add {new_label}", [diff])
+        index.add(new_label.start, new_label.end, new_label)
         self.update_label_list()
 
     def delete_label(self):
-        selected = self.label_list.currentItem()
-        if not selected:
+        old = self.selected_entry()
+        if old is None:
             return
-        label_str = selected.text()
-        label_str = label_str.split(' - ', 1)[-1]
-        labels = self.labels_by_id.get(self.selected_person_id, [])
-        for i, l in enumerate(labels):
-            if str(l) == label_str:
-                del labels[i]
-                break
+        labels = self.labels_by_id[old.person_id]
+        diff = delete_row_diff(labels, labels.index(old))
+        diff.apply(labels)
+        self.get_label_index(old.person_id).remove(old.start, old.end, old)
+        self.record_edit("delete", old.person_id, old=[old.label, old.start, old.end])
+        self.push_history(f"delete {old}", [diff])
         self.update_label_list()
 
+    def selected_entry(self, row=None):
+        if row is None:
+            row = self.label_list.currentRow()
+        if 0 <= row < len(self.current_matches):
+            return self.current_matches[row]
+        return None
+
     def label_selected(self, item):
-        label_str = item.text()
-        label_str = label_str.split(' - ', 1)[-1]
-        labels = self.labels_by_id.get(self.selected_person_id, [])
-        for l in labels:
-            if str(l) == label_str:
-                self.label_edit.setText(l.label)
-                self.start_edit.setText(str(l.start))
-                self.end_edit.setText(str(l.end))
-                break
+        l = self.selected_entry(self.label_list.row(item))
+        if l is not None:
+            self.label_edit.setText(l.label)
+            self.start_edit.setText(str(l.start))
+            self.end_edit.setText(str(l.end))
+
+    def record_edit(self, op, person_id, **fields):
+        # Journaling is the autosave: each edit is durable as soon as it is recorded
+        self.dirty_person_ids.add(person_id)
+        self.timeline.update_person(person_id)
+        if self.journal is None:
+            return
+        self.journal.record(op, person_id, **fields)
+        if self.journal.records >= self.COMPACT_EVERY:
+            self.compact_labels()
 
+    def compact_labels(self, wait=False):
+        """Rewrite the canonical label file from a snapshot, on the save thread unless wait is set."""
+        if self.journal is None or not self.dirty_person_ids:
+            return
+        if self.compaction is not None and not self.compaction.done():
+            if not wait:
+                return  # edits stay in the journal until the next compaction
+            self.compaction.result()
+        base = file_base(self.label_file)
+        self.journal.rotate()
+        blocks = [(p, self.labels_by_id[p].copy()) for p in self._person_order() if p in self.labels_by_id]
+        self.dirty_person_ids = set()
+        self.compaction = self.save_executor.submit(self._write_compacted, self.label_file, self.journal, blocks, base)
+        if wait:
+            self.compaction.result()
+
+    @staticmethod
+    @traced("write_labels")
+    def _write_compacted(label_file, journal, blocks, base):
+        write_labels_atomic(label_file, blocks)
+        journal.discard_rotated(base)
+
+    def close_journal(self):
+        if self.journal is None:
+            return
+        self.compact_labels(wait=True)
+        if self.compaction is not None:
+            self.compaction.result()
+        self.journal.close()
+        self.journal = None
+
+    @pyqtSlot()
+    @traced("save_labels")
     def save_labels(self):
         if not self.label_file:
             return
-        with open(self.label_file, 'w') as f:
-            for person_id in self.person_ids:
-                f.write(f"{person_id}: student, appearance\n")
-                for l in self.labels_by_id.get(person_id, []):
-                    f.write(f"{l.label}: {l.start} - {l.end}\n")
+        if self.label_store is not None:
+            self.save_to_store()
+            QMessageBox.information(self, "Saved", "Labels saved successfully.")
+            return
+        if self.compaction is not None and self.compaction.done() and self.compaction.exception():
+            QMessageBox.warning(self, "Save Failed", f"Last save failed: {self.compaction.exception()}")
+        self.compact_labels()
         QMessageBox.information(self, "Saved", "Labels saved successfully.")
 
+    def export_arrays(self):
+        """Export per-frame label ids of every person, one column per frame of the loaded video."""
+        if not self.person_ids and not self.labels_by_id:
+            QMessageBox.warning(self, "No Data", "Load labels before exporting.")
+            return
+        file, _ = QFileDialog.getSaveFileName(self, "Export Label Arrays", filter="Label Arrays (*.json)")
+        if not file:
+            return
+        self.ensure_labels_loaded()
+        labels = {p: self.labels_by_id[p] for p in self._person_order() if p in self.labels_by_id}
+        frame_numbers = self.frame_index.numbers if self.frame_index else None
+        manifest = export_labels(labels, os.path.splitext(file)[0], frame_numbers=frame_numbers)
+        rows, cols = manifest["shape"]
+        QMessageBox.information(self, "Exported", f"Exported {rows} persons x {cols} frames.")
+
+    def closeEvent(self, event):
+        self.close_journal()
+        self.close_label_store()
+        self.close_session()
+        self.frame_scan = None
+        self.scan_executor.shutdown(wait=False, cancel_futures=True)
+        self.save_executor.shutdown()
+        self.frame_cache.shutdown()
+        super().closeEvent(event)
+
     def person_id_changed(self, idx):
         if idx < 0 or idx >= len(self.person_ids):
             return
         self.selected_person_id = self.person_ids[idx]
+        self.ensure_labels_loaded([self.selected_person_id])
+        self.timeline.set_selected_person(self.selected_person_id)
         self.update_label_list()
 
+    def timeline_clicked(self, frame_num):
+        if self.frame_index:
+            self.slider.setValue(self.frame_index.nearest_index(frame_num))
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = VideoLabeler()
@@ -0,0 +1,175 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from frame_index import FrameIndex, parse_frame_name
+from frame_pack import FramePack, is_frame_pack, PACK_EXTENSION
+from label_journal import load_with_journal
+
+# Session mode: one root directory holding many videos. A video is either a frame folder or a
+# .fpack file directly under the root; its label file is looked up next to it (see label_path_for).
+# Frame indexes and labels of the current video's neighbours are loaded on a thread pool, and loaded
+# videos stay in an LRU cache bounded by an estimate of their memory, so switching is immediate.
+
+LABEL_NAMES = ("labels.txt",)  # label file names looked for inside a video's frame folder
+
+
+class SessionVideo:
+    __slots__ = ('name', 'frame_source', 'label_file')
+
+    def __init__(self, name, frame_source, label_file):
+        self.name = name
+        self.frame_source = frame_source  # frame folder or .fpack path
+        self.label_file = label_file  # may not exist yet; created on first save
+
+
+class LoadedVideo:
+    """Everything VideoLabeler needs to show a video, loaded off the GUI thread."""
+    __slots__ = ('video', 'frame_index', 'frame_pack', 'labels_by_id', 'recovered', 'nbytes')
+
+    def __init__(self, video, frame_index, frame_pack, labels_by_id, recovered):
+        self.video = video
+        self.frame_index = frame_index
+        self.frame_pack = frame_pack
+        self.labels_by_id = labels_by_id
+        self.recovered = recovered
+        self.nbytes = self.estimate_bytes()
+
+    def estimate_bytes(self):
+        rows = sum(len(table) for table in self.labels_by_id.values())
+        # Three 4-byte columns per row plus table overhead, and the frame index arrays
+        size = rows * 12 + len(self.labels_by_id) * 512
+        size += self.frame_index.numbers.itemsize * len(self.frame_index.numbers)
+        size += self.frame_index._positions.itemsize * len(self.frame_index._positions)
+        return size
+
+    def close(self):
+        if self.frame_pack is not None:
+            self.frame_pack.close()
+
+
+def label_path_for(root, name, frame_source):
+    """<root>/<name>.txt if present, else labels.txt inside the frame folder, else <root>/<name>.txt."""
+    beside = os.path.join(root, name + ".txt")
+    if os.path.exists(beside):
+        return beside
+    if os.path.isdir(frame_source):
+        for label_name in LABEL_NAMES:
+            inside = os.path.join(frame_source, label_name)
+            if os.path.exists(inside):
+                return inside
+    return beside
+
+
+def _has_frames(folder):
+    with os.scandir(folder) as it:
+        return any(parse_frame_name(entry.name) is not None for entry in it)
+
+
+def discover_videos(root):
+    """SessionVideo for every frame folder and frame pack directly under root, sorted by name."""
+    videos = []
+    with os.scandir(root) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for entry in entries:
+        if entry.is_dir() and _has_frames(entry.path):
+            name = entry.name
+        elif entry.is_file() and is_frame_pack(entry.path):
+            name = entry.name[:-len(PACK_EXTENSION)]
+        else:
+            continue
+        videos.append(SessionVideo(name, entry.path, label_path_for(root, name, entry.path)))
+    return videos
+
+
+def load_video(video):
+    """Read a video's frame index and labels (replaying any crash journal). Runs on worker threads."""
+    frame_pack = None
+    if is_frame_pack(video.frame_source):
+        frame_pack = FramePack(video.frame_source)
+        frame_index = FrameIndex(frame_pack.frame_numbers)
+    else:
+        frame_index = FrameIndex.from_folder(video.frame_source)
+    labels_by_id, recovered = load_with_journal(video.label_file)
+    return LoadedVideo(video, frame_index, frame_pack, labels_by_id, recovered)
+
+
+class VideoSession:
+    """
+    The videos under a root directory plus a bounded cache of loaded ones. get() returns a Future;
+    prefetch(i) queues the neighbours of video i. The pinned video (the one on screen) is never evicted.
+    """
+
+    def __init__(self, root, max_bytes=512 * 1024 * 1024, neighbours=2, workers=2):
+        self.root = root
+        self.videos = discover_videos(root)
+        self.max_bytes = max_bytes
+        self.neighbours = neighbours
+        self.pinned = None
+        self._loaded = OrderedDict()  # {name: Future of LoadedVideo}, least recently used first
+        self._lock = threading.RLock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="session-load")
+
+    def __len__(self):
+        return len(self.videos)
+
+    def names(self):
+        return [video.name for video in self.videos]
+
+    def index_of(self, name):
+        for i, video in enumerate(self.videos):
+            if video.name == name:
+                return i
+        return -1
+
+    def get(self, idx):
+        """Future of the LoadedVideo for videos[idx], from the cache or newly queued."""
+        video = self.videos[idx]
+        with self._lock:
+            future = self._loaded.get(video.name)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._loaded[video.name] = self._executor.submit(load_video, video)
+                future.add_done_callback(lambda f: self._evict())
+            self._loaded.move_to_end(video.name)
+        return future
+
+    def pin(self, idx):
+        self.pinned = self.videos[idx].name
+        self._evict()
+
+    def prefetch(self, idx):
+        """Queue the videos around idx, nearest first."""
+        for step in range(1, self.neighbours + 1):
+            for neighbour in (idx + step, idx - step):
+                if 0 <= neighbour < len(self.videos):
+                    with self._lock:
+                        if self.videos[neighbour].name in self._loaded:
+                            continue
+                    self.get(neighbour)
+
+    def cached_bytes(self):
+        with self._lock:
+            return sum(f.result().nbytes for f in self._loaded.values() if f.done() and not f.exception())
+
+    def _evict(self):
+        with self._lock:
+            total = self.cached_bytes()
+            for name in list(self._loaded):
+                if total <= self.max_bytes:
+                    break
+                future = self._loaded[name]
+                if name == self.pinned or not future.done():
+                    continue
+                del self._loaded[name]
+                if future.exception() is None:
+                    loaded = future.result()
+                    total -= loaded.nbytes
+                    loaded.close()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            for future in self._loaded.values():
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    future.result().close()
+            self._loaded.clear()